@@ -0,0 +1,173 @@
+"""
+API latency, throughput and queries per request under a scripted traffic mix.
+
+Run: python manage.py test benchmarks.bench_api -p "bench_*.py"
+
+Environment:
+    BENCH_PROFILE           dataset profile from benchmarks.dataset.PROFILES, small by default
+    BENCH_REQUESTS          number of requests, 500 by default
+    BENCH_SEED              seed of the dataset and the traffic, 0 by default
+    BENCH_UPDATE_BASELINE   save results as the profile baseline when set to 1
+
+Results are written to benchmarks/results/<profile>.json. Queries per request are compared with
+benchmarks/baselines/<profile>.json, the run fails if a scenario makes more queries than its baseline.
+"""
+import json
+import os
+import random
+import time
+from pathlib import Path
+from statistics import quantiles
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from benchmarks.dataset import PROFILES, build_dataset
+from materials.tests_materials.stripe_stub import StripeStub
+from users.models import UserRole
+
+PROFILE = os.getenv('BENCH_PROFILE', 'small')
+REQUESTS = int(os.getenv('BENCH_REQUESTS', 500))
+SEED = int(os.getenv('BENCH_SEED', 0))
+UPDATE_BASELINE = os.getenv('BENCH_UPDATE_BASELINE') == '1'
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+TRAFFIC_MIX = {
+    'course_list': 30,
+    'course_detail': 20,
+    'lesson_list': 20,
+    'payments_filter': 15,
+    'subscribe': 10,
+    'buy': 5,
+}
+CLIENTS = 50
+
+
+class ApiBenchmark(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stripe = StripeStub().start()
+        cls.settings_override = override_settings(STRIPE_SECRET_KEY='sk_test_stub', STRIPE_API_BASE=cls.stripe.url)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.stripe.stop()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        users, cls.courses, _ = build_dataset(PROFILES[PROFILE], SEED)
+
+        rng = random.Random(SEED)
+        cls.tokens = {user.pk: f'Bearer {AccessToken.for_user(user)}' for user in rng.sample(users, CLIENTS)}
+        cls.tokens.update({course.owner_id: f'Bearer {AccessToken.for_user(course.owner)}'
+                           for course in rng.sample(cls.courses, min(CLIENTS, len(cls.courses)))})
+        cls.moderators = [user.pk for user in users if user.role == UserRole.MODERATOR and user.pk in cls.tokens]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.rng = random.Random(SEED)
+
+    def random_user(self):
+        return self.rng.choice(list(self.tokens))
+
+    def course_list(self):
+        return self.random_user(), 'get', '/course/?page_size=20'
+
+    def course_detail(self):
+        # detail is available to the owner and moderators
+        course = self.rng.choice([course for course in self.courses if course.owner_id in self.tokens])
+        user = self.rng.choice(self.moderators + [course.owner_id])
+        return user, 'get', f'/course/{course.pk}/'
+
+    def lesson_list(self):
+        return self.random_user(), 'get', '/lesson/?page_size=20'
+
+    def payments_filter(self):
+        course = self.rng.choice(self.courses)
+        return self.random_user(), 'get', f'/payments/?paid_course={course.pk}&ordering=-payment_date'
+
+    def subscribe(self):
+        course = self.rng.choice(self.courses)
+        return self.random_user(), 'post', f'/course/{course.pk}/subscribe/'
+
+    def buy(self):
+        course = self.rng.choice(self.courses)
+        return self.random_user(), 'post', f'/course/{course.pk}/buy/'
+
+    def run_traffic(self):
+        scenarios = self.rng.choices(list(TRAFFIC_MIX), weights=list(TRAFFIC_MIX.values()), k=REQUESTS)
+        measurements = {scenario: ([], []) for scenario in TRAFFIC_MIX}
+
+        start = time.perf_counter()
+        for scenario in scenarios:
+            user, method, url = getattr(self, scenario)()
+
+            with CaptureQueriesContext(connection) as context:
+                request_start = time.perf_counter()
+                response = getattr(self.client, method)(url, HTTP_AUTHORIZATION=self.tokens[user])
+                latency = time.perf_counter() - request_start
+
+            self.assertIn(response.status_code, (200, 201), msg=f'{method.upper()} {url}')
+            measurements[scenario][0].append(latency)
+            measurements[scenario][1].append(len(context))
+        elapsed = time.perf_counter() - start
+
+        return measurements, elapsed
+
+    def test_api(self):
+        measurements, elapsed = self.run_traffic()
+
+        results = {
+            'profile': PROFILE,
+            'dataset': PROFILES[PROFILE],
+            'requests': REQUESTS,
+            'seed': SEED,
+            'requests_per_second': round(REQUESTS / elapsed, 1),
+            'scenarios': {},
+        }
+        for scenario, (latencies, queries) in measurements.items():
+            if not latencies:
+                continue
+            percentiles = quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+            results['scenarios'][scenario] = {
+                'requests': len(latencies),
+                'p50_ms': round(percentiles[49] * 1000, 2),
+                'p95_ms': round(percentiles[94] * 1000, 2),
+                'p99_ms': round(percentiles[98] * 1000, 2),
+                'queries_per_request': round(sum(queries) / len(queries), 2),
+            }
+
+        self.save(BENCHMARKS_DIR / 'results' / f'{PROFILE}.json', results)
+        baseline_path = BENCHMARKS_DIR / 'baselines' / f'{PROFILE}.json'
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+        if UPDATE_BASELINE:
+            self.save(baseline_path, results)
+
+        print(f'\nprofile {PROFILE}: {REQUESTS} requests, {results["requests_per_second"]} req/s')
+        for scenario, stats in results['scenarios'].items():
+            print(f'{scenario:>16}: p50 {stats["p50_ms"]:>7} ms, p95 {stats["p95_ms"]:>7} ms, '
+                  f'p99 {stats["p99_ms"]:>7} ms, {stats["queries_per_request"]} queries/request')
+
+        if baseline and not UPDATE_BASELINE:
+            for scenario, stats in results['scenarios'].items():
+                if scenario in baseline['scenarios']:
+                    self.assertLessEqual(
+                        stats['queries_per_request'],
+                        baseline['scenarios'][scenario]['queries_per_request'],
+                        msg=f'{scenario} makes more queries per request than the baseline'
+                    )
+
+    @staticmethod
+    def save(path, results):
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(json.dumps(results, indent=4, ensure_ascii=False) + '\n')
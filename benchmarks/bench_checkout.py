@@ -0,0 +1,85 @@
+"""
+Throughput of sync and async checkout endpoints against a slow local Stripe stub.
+
+The sync endpoint is served by a fixed number of worker threads, like a WSGI server,
+the async one by a single event loop, like one ASGI worker.
+
+Run: python manage.py test benchmarks.bench_checkout -p "bench_*.py"
+"""
+import asyncio
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.db import connection, connections
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from materials.models import Course
+from materials.tests_materials.stripe_stub import StripeStub
+from users.models import User
+
+REQUESTS = 200
+SYNC_WORKERS = 4
+STRIPE_DELAY = 0.05
+
+
+class CheckoutBenchmark(TransactionTestCase):
+
+    def setUp(self):
+        self.stripe = StripeStub(delay=STRIPE_DELAY).start()
+        self.settings_override = override_settings(STRIPE_SECRET_KEY='sk_test_stub', STRIPE_API_BASE=self.stripe.url)
+        self.settings_override.enable()
+
+        self.user = User.objects.create(email='member@bench.ru', password='bench')
+        self.course = Course.objects.create(title='bench', description='bench')
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.stripe.stop()
+
+    def run_sync(self):
+        url = reverse('materials:create-payment', kwargs={'pk': self.course.pk})
+        statuses = []
+
+        def worker(requests):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=self.headers['Authorization'])
+            for _ in range(requests):
+                statuses.append(client.post(url).status_code)
+            connection.close()
+
+        workers = [threading.Thread(target=worker, args=(REQUESTS // SYNC_WORKERS,)) for _ in range(SYNC_WORKERS)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return statuses
+
+    async def run_async(self):
+        url = reverse('materials:course-buy-async', kwargs={'pk': self.course.pk})
+        client = AsyncClient()
+        responses = await asyncio.gather(*(client.post(url, headers=self.headers) for _ in range(REQUESTS)))
+        await sync_to_async(connections.close_all)()
+        return [response.status_code for response in responses]
+
+    def test_checkout_throughput(self):
+        # warm stripe catalog, so both modes make a single session call per purchase
+        response = APIClient().post(reverse('materials:create-payment', kwargs={'pk': self.course.pk}),
+                                    HTTP_AUTHORIZATION=self.headers['Authorization'])
+        self.assertEqual(response.status_code, 200)
+
+        results = {}
+        for mode, run in (('sync', self.run_sync), ('async', lambda: asyncio.run(self.run_async()))):
+            start = time.perf_counter()
+            statuses = run()
+            elapsed = time.perf_counter() - start
+
+            self.assertEqual(set(statuses), {200})
+            results[mode] = len(statuses) / elapsed
+
+        print(f'\ncheckout, stripe delay {STRIPE_DELAY}s: sync ({SYNC_WORKERS} workers) {results["sync"]:.0f} req/s, '
+              f'async (1 worker) {results["async"]:.0f} req/s')
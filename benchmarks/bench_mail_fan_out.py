@@ -0,0 +1,44 @@
+"""
+Throughput of course update notifications.
+
+Run: python manage.py test benchmarks -p "bench_*.py"
+"""
+import time
+
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from config.celery import app
+from materials.models import Course, Subscription
+from materials.tasks import course_update_fan_out
+from users.models import User
+
+SUBSCRIBERS = 5000
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class MailFanOutBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(title='bench', description='bench')
+        users = User.objects.bulk_create(
+            User(email=f'member{i}@bench.ru', password='bench') for i in range(SUBSCRIBERS)
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=user, course=cls.course) for user in users
+        )
+
+    def setUp(self):
+        app.conf.task_always_eager = True
+
+    def tearDown(self):
+        app.conf.task_always_eager = False
+
+    def test_fan_out_throughput(self):
+        start = time.perf_counter()
+        course_update_fan_out(self.course.pk, self.course.title)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(mail.outbox), SUBSCRIBERS)
+        print(f'\nmail fan-out: {SUBSCRIBERS} emails in {elapsed:.2f}s, {SUBSCRIBERS / elapsed:.0f} emails/s')
@@ -0,0 +1,66 @@
+"""
+Latency of the first and the 10,000th page of payments, keyset against page number pagination.
+
+Run: python manage.py test benchmarks.bench_pagination -p "bench_*.py"
+"""
+import json
+import time
+from base64 import b64encode
+
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from materials.models import Payments
+from materials.paginators import MyPagination
+from users.models import User
+
+PAGE_SIZE = 10
+PAGES = 10000
+REPEAT = 20
+
+
+class PaginationBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='member@bench.ru', password='bench')
+        Payments.objects.bulk_create(
+            (Payments(user=cls.user, amount=i, payment_method='наличные') for i in range(PAGE_SIZE * PAGES)),
+            batch_size=10000
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def measure(self, func):
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            func()
+        return (time.perf_counter() - start) / REPEAT * 1000
+
+    def keyset_page(self, position):
+        params = {'page_size': PAGE_SIZE}
+        if position is not None:
+            params['cursor'] = b64encode(json.dumps({'p': [position], 'r': 0}).encode()).decode()
+        response = self.client.get('/payments/', params)
+        self.assertEqual(len(response.json()['results']), PAGE_SIZE)
+
+    def page_number_page(self, page):
+        request = Request(APIRequestFactory().get('/payments/', {'page': page, 'page_size': PAGE_SIZE}))
+        self.assertEqual(len(MyPagination().paginate_queryset(Payments.objects.order_by('pk'), request)), PAGE_SIZE)
+
+    def test_deep_page_latency(self):
+        deep_position = Payments.objects.order_by('pk').values_list('pk', flat=True)[PAGE_SIZE * (PAGES - 1) - 1]
+
+        results = {
+            'keyset first': self.measure(lambda: self.keyset_page(None)),
+            f'keyset page {PAGES}': self.measure(lambda: self.keyset_page(deep_position)),
+            'page number first': self.measure(lambda: self.page_number_page(1)),
+            f'page number page {PAGES}': self.measure(lambda: self.page_number_page(PAGES)),
+        }
+
+        print()
+        for name, latency in results.items():
+            print(f'{name}: {latency:.2f} ms')
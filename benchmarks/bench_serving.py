@@ -0,0 +1,147 @@
+"""
+Throughput and latency of the development server against the production Gunicorn profile.
+
+Both servers run as separate processes on the test database and are loaded by concurrent clients
+reading course and lesson lists, the slow Stripe stub adds checkout requests waiting on I/O.
+
+Run: python manage.py test benchmarks.bench_serving -p "bench_*.py"
+
+Environment:
+    BENCH_REQUESTS          number of requests per server, 1000 by default
+    BENCH_CLIENTS           number of concurrent clients, 50 by default
+
+Results are written to benchmarks/results/serving.json.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from statistics import quantiles
+
+import httpx
+from django.conf import settings
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from benchmarks.dataset import PROFILES, build_dataset
+from materials.tests_materials.stripe_stub import StripeStub
+
+REQUESTS = int(os.getenv('BENCH_REQUESTS', 1000))
+CLIENTS = int(os.getenv('BENCH_CLIENTS', 50))
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+SERVERS = {
+    'runserver': [sys.executable, 'manage.py', 'runserver', '--noreload', '127.0.0.1:{port}'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'config/gunicorn.py', '--bind', '127.0.0.1:{port}',
+                 '--access-logfile', '/dev/null'],
+}
+TRAFFIC = ['/course/', '/lesson/', '/course/', '/lesson/', 'checkout']
+STRIPE_DELAY = 0.05
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ServingBenchmark(TransactionTestCase):
+
+    def setUp(self):
+        self.stripe = StripeStub(delay=STRIPE_DELAY).start()
+        users, courses, _ = build_dataset(PROFILES['small'])
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(users[0])}'}
+        self.checkout = f'/course/{courses[0].pk}/buy/async/'
+
+        # servers use the test database filled by this process
+        self.env = {
+            **os.environ,
+            'DJANGO_DEBUG': 'False',
+            'POSTGRES_DB': connection.settings_dict['NAME'],
+            'POSTGRES_HOST': connection.settings_dict['HOST'],
+            'POSTGRES_PORT': str(connection.settings_dict['PORT']),
+            'STRIPE_SECRET_KEY': 'sk_test_stub',
+            'STRIPE_API_BASE': self.stripe.url,
+        }
+
+    def tearDown(self):
+        self.stripe.stop()
+
+    def start(self, command):
+        port = free_port()
+        process = subprocess.Popen(
+            [arg.format(port=port) for arg in command], cwd=settings.BASE_DIR, env=self.env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        url = f'http://127.0.0.1:{port}'
+        for _ in range(100):
+            try:
+                httpx.get(f'{url}/course/', headers=self.headers)
+                return process, url
+            except httpx.TransportError:
+                time.sleep(0.1)
+        process.kill()
+        raise RuntimeError(f'{command[2]} did not start')
+
+    async def load(self, url):
+        latencies = []
+        errors = 0
+        queue = asyncio.Queue()
+        for i in range(REQUESTS):
+            queue.put_nowait(TRAFFIC[i % len(TRAFFIC)])
+
+        async def client():
+            nonlocal errors
+            async with httpx.AsyncClient(base_url=url, headers=self.headers, timeout=60) as http:
+                while not queue.empty():
+                    path = queue.get_nowait()
+                    start = time.perf_counter()
+                    if path == 'checkout':
+                        response = await http.post(self.checkout)
+                    else:
+                        response = await http.get(path)
+                    latencies.append(time.perf_counter() - start)
+                    errors += response.status_code >= 400
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(CLIENTS)))
+        elapsed = time.perf_counter() - start
+
+        p50, p95, p99 = (quantiles(latencies, n=100)[i] * 1000 for i in (49, 94, 98))
+        return {
+            'requests_per_second': round(REQUESTS / elapsed, 1),
+            'p50_ms': round(p50, 1),
+            'p95_ms': round(p95, 1),
+            'p99_ms': round(p99, 1),
+            'errors': errors,
+        }
+
+    def test_serving(self):
+        results = {}
+        for name, command in SERVERS.items():
+            process, url = self.start(command)
+            try:
+                results[name] = asyncio.run(self.load(url))
+            finally:
+                process.terminate()
+                process.wait()
+
+        print(f'\n{REQUESTS} requests, {CLIENTS} clients, {os.cpu_count()} CPU')
+        print(f'{"server":<12}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        for name, result in results.items():
+            print(f'{name:<12}{result["requests_per_second"]:>10}{result["p50_ms"]:>10}'
+                  f'{result["p95_ms"]:>10}{result["p99_ms"]:>10}{result["errors"]:>8}')
+
+        results_dir = BENCHMARKS_DIR / 'results'
+        results_dir.mkdir(exist_ok=True)
+        (results_dir / 'serving.json').write_text(json.dumps(results, indent=4))
+
+        self.assertEqual(
+            [result['errors'] for result in results.values()],
+            [0, 0]
+        )
@@ -0,0 +1,91 @@
+"""
+Synthetic dataset of configurable size for benchmarks.
+"""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db.models import DateField, ExpressionWrapper, F, Value
+
+from materials.models import Course, Lesson, Payments, Subscription
+from users.models import User, UserRole
+
+PROFILES = {
+    'small': {
+        'users': 200,
+        'courses': 20,
+        'lessons_per_course': 5,
+        'subscriptions': 500,
+        'payments': 2000,
+    },
+    'medium': {
+        'users': 2000,
+        'courses': 200,
+        'lessons_per_course': 10,
+        'subscriptions': 10000,
+        'payments': 100000,
+    },
+    'large': {
+        'users': 20000,
+        'courses': 2000,
+        'lessons_per_course': 20,
+        'subscriptions': 200000,
+        'payments': 1000000,
+    },
+}
+
+MODERATORS_SHARE = 0.1
+FIRST_PAYMENT_DATE = date(2022, 1, 1)
+BATCH_SIZE = 5000
+
+
+def build_dataset(profile, seed=0):
+    """
+    Fill the database with the profile dataset, the same seed gives the same data.
+    """
+    rng = random.Random(seed)
+    password = make_password('bench')
+
+    users = User.objects.bulk_create(
+        (User(email=f'user{i}@bench.ru', password=password,
+              role=UserRole.MODERATOR if rng.random() < MODERATORS_SHARE else UserRole.MEMBER)
+         for i in range(profile['users'])),
+        batch_size=BATCH_SIZE
+    )
+
+    courses = Course.objects.bulk_create(
+        (Course(title=f'course {i}', description='bench', price=rng.randint(100, 1000), owner=rng.choice(users))
+         for i in range(profile['courses'])),
+        batch_size=BATCH_SIZE
+    )
+
+    lessons = Lesson.objects.bulk_create(
+        (Lesson(title=f'lesson {i}', description='bench', price=rng.randint(10, 100), course=course,
+                owner=course.owner)
+         for course in courses for i in range(profile['lessons_per_course'])),
+        batch_size=BATCH_SIZE
+    )
+
+    pairs = set()
+    while len(pairs) < min(profile['subscriptions'], len(users) * len(courses)):
+        pairs.add((rng.randrange(len(users)), rng.randrange(len(courses))))
+    Subscription.objects.bulk_create(
+        (Subscription(user=users[user], course=courses[course]) for user, course in sorted(pairs)),
+        batch_size=BATCH_SIZE
+    )
+
+    methods = [method for method, _ in Payments.PAYMENT_METHOD]
+    for start in range(0, profile['payments'], BATCH_SIZE):
+        Payments.objects.bulk_create([
+            Payments(user=rng.choice(users), amount=rng.randint(10, 1000), payment_method=rng.choice(methods),
+                     **({'paid_course': rng.choice(courses)} if rng.random() < 0.5
+                        else {'paid_lesson': rng.choice(lessons)}))
+            for _ in range(min(BATCH_SIZE, profile['payments'] - start))
+        ])
+
+    # payment_date is auto_now_add, spread payments over two years afterwards
+    Payments.objects.update(payment_date=ExpressionWrapper(
+        Value(FIRST_PAYMENT_DATE) + F('pk') % 730 * Value(timedelta(days=1)), output_field=DateField()
+    ))
+
+    return users, courses, lessons
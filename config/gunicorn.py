@@ -0,0 +1,76 @@
+"""
+Gunicorn configuration of the production server.
+
+Run: gunicorn -c config/gunicorn.py
+
+Environment:
+    GUNICORN_BIND               address to listen, 0.0.0.0:8000 by default
+    GUNICORN_WORKER_CLASS       uvicorn serves config.asgi with async views on an event loop and nginx serves
+                                static files, gthread serves config.wsgi with a pool of threads and static files
+                                by WhiteNoise, uvicorn by default
+    WEB_CONCURRENCY             number of worker processes, 2 * CPU + 1 by default
+    GUNICORN_THREADS            threads of a gthread worker, 2 * CPU by default
+    PROMETHEUS_MULTIPROC_DIR    directory of metrics files of the workers, cleared at start,
+                                prometheus in worker_tmp_dir by default
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+CPU_COUNT = multiprocessing.cpu_count()
+ASGI = os.getenv('GUNICORN_WORKER_CLASS', 'uvicorn') == 'uvicorn'
+
+if ASGI:
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    # Django 4.2 can't reuse connections between ASGI requests, every request runs in its own thread
+    # and a persistent connection would stay open until the worker exits, use PgBouncer for pooling
+    os.environ['POSTGRES_CONN_MAX_AGE'] = '0'
+else:
+    wsgi_app = 'config.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', CPU_COUNT * 2))
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', CPU_COUNT * 2 + 1))
+
+# requests running longer are killed, on restart workers finish requests in progress
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# restart workers after a number of requests against memory creep, jitter spreads restarts in time
+max_requests = 1000
+max_requests_jitter = 100
+
+# import Django once in the master, workers are forked with the application loaded
+preload_app = True
+
+# heartbeat files on tmpfs, docker overlay filesystem may block workers
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# every worker writes metrics to its own files, /metrics sums them up; set before the application is loaded,
+# prometheus_client chooses where values are kept on import
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(worker_tmp_dir or tempfile.gettempdir(), 'prometheus'))
+
+accesslog = '-'
+forwarded_allow_ips = '*'
+
+
+def on_starting(server):
+    # files of the previous run would be added to the new counters
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+
+def child_exit(server, worker):
+    # values of an exited worker stay in the sums, its gauges of live processes are removed
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    # connections opened by the master while loading the application must not be shared by workers
+    from django.db import connections
+    connections.close_all()
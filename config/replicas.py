@@ -0,0 +1,129 @@
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+PIN_KEY = 'db:pin:{}'
+
+# caches not seen by other processes, a client writing through one worker would read lagging replicas
+# through the others
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+class ReplicaState:
+    """
+    Whether reads of the current request may go to replicas and whether it has written.
+    """
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+        self.wrote = False
+
+
+current_replica_state = ContextVar('current_replica_state', default=None)
+
+
+class ReplicaRouter:
+    """
+    Send reads of safe requests to a random replica and everything else to the primary.
+    Celery tasks, management commands and writing requests are never routed to replicas.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current_replica_state.get()
+        if state is None or not state.allowed or not settings.DATABASE_REPLICAS:
+            return 'default'
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = current_replica_state.get()
+        if state is not None:
+            # the rest of the request has to read its own writes
+            state.allowed = False
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaMiddleware:
+    """
+    Allow replica reads for safe requests and pin the client to the primary
+    for REPLICA_PIN_SECONDS after it writes, so it reads its own writes despite replication lag.
+    Pins are kept in the default cache, which has to be shared by all workers when replicas are configured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DATABASE_REPLICAS and settings.CACHES['default']['BACKEND'] in LOCAL_CACHE_BACKENDS:
+            raise ImproperlyConfigured('DATABASE_REPLICAS require a shared default cache, set REDIS_CACHE_URL.')
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = ReplicaState(self.replicas_allowed(request))
+        token = current_replica_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_replica_state.reset(token)
+        return self.process_response(request, response, state)
+
+    async def __acall__(self, request):
+        state = ReplicaState(await self.areplicas_allowed(request))
+        token = current_replica_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_replica_state.reset(token)
+        return self.process_response(request, response, state)
+
+    def replicas_allowed(self, request):
+        if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+            return False
+        key = get_pin_key(request)
+        return key is None or not cache.get(key)
+
+    async def areplicas_allowed(self, request):
+        if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+            return False
+        key = get_pin_key(request)
+        return key is None or not await cache.aget(key)
+
+    @staticmethod
+    def process_response(request, response, state):
+        wrote = request.method not in SAFE_METHODS or state.wrote
+        key = get_pin_key(request)
+        if settings.DATABASE_REPLICAS and wrote and key is not None:
+            cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+
+def get_pin_key(request):
+    """
+    Cache key of the client by its credentials, before the view has authenticated the user.
+    """
+    credentials = (request.headers.get('Authorization')
+                   or request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    if not credentials:
+        return None
+    return PIN_KEY.format(hashlib.md5(credentials.encode()).hexdigest())
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
@@ -26,9 +27,9 @@ load_dotenv(BASE_DIR / '.env')
 SECRET_KEY = os.getenv('DJANGO_SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DJANGO_DEBUG', 'True') == 'True'
 
-ALLOWED_HOSTS = ['0.0.0.0', 'localhost', '127.0.0.1']
+ALLOWED_HOSTS = os.getenv('DJANGO_ALLOWED_HOSTS', '0.0.0.0,localhost,127.0.0.1').split(',')
 
 # Application definition
 
@@ -48,10 +49,18 @@ INSTALLED_APPS = [
 
     'users',
     'materials',
+    'monitoring',
 ]
 
+# WhiteNoise serves static files for the gthread worker only, its middleware is sync and would run every request
+# of the uvicorn worker in a thread, nginx serves static files of the ASGI deployment
+SERVE_STATIC = os.getenv('GUNICORN_WORKER_CLASS', 'uvicorn') == 'gthread'
+
 MIDDLEWARE = [
+    'monitoring.middleware.TimingMiddleware',
+    'config.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    *(['whitenoise.middleware.WhiteNoiseMiddleware'] if SERVE_STATIC else []),
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,11 +98,83 @@ DATABASES = {
         'NAME': os.getenv('POSTGRES_DB'),
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
-        'HOST': 'db',
-        'PORT': 5432
+        'HOST': os.getenv('POSTGRES_HOST', 'db'),
+        'PORT': int(os.getenv('POSTGRES_PORT', 5432)),
+        # persistent connections checked before reuse by each request
+        'CONN_MAX_AGE': int(os.getenv('POSTGRES_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        # PgBouncer in transaction mode can't keep server-side cursors between transactions
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('PGBOUNCER_TRANSACTION_POOLING') == 'True',
     }
 }
 
+# Read-only replicas for reads of safe requests, comma separated hosts, require REDIS_CACHE_URL
+DATABASE_REPLICAS = []
+for number, host in enumerate(filter(None, os.getenv('POSTGRES_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['config.replicas.ReplicaRouter']
+
+# Seconds a client reads from the primary after writing, should exceed replication lag
+REPLICA_PIN_SECONDS = 10
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+REDIS_CACHE_SERIALIZER = 'django.core.cache.backends.redis.RedisSerializer'
+
+TESTING = sys.argv[1:2] == ['test']
+
+if os.getenv('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_CACHE_URL'),
+            'OPTIONS': {
+                'serializer': REDIS_CACHE_SERIALIZER,
+            },
+        }
+    }
+elif TESTING:
+    import fakeredis
+
+    # in-process redis stand-in for tests
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://localhost:6379',
+            'OPTIONS': {
+                'serializer': REDIS_CACHE_SERIALIZER,
+                'connection_class': fakeredis.FakeConnection,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Users and courses read on most requests are cached in a per-process LRU (L1) in front of the shared cache,
+# L1 entries of other processes stay stale for up to OBJECT_CACHE_L1_TIMEOUT seconds after invalidation.
+# Invalidation by celery workers, like deactivation of users, reaches web workers through a shared cache only,
+# without redis objects are read from the database.
+OBJECT_CACHE_ENABLED = bool(os.getenv('REDIS_CACHE_URL')) or TESTING
+OBJECT_CACHE_TIMEOUT = 60 * 10
+OBJECT_CACHE_L1_TIMEOUT = 5
+OBJECT_CACHE_L1_MAX_ENTRIES = 1000
+OBJECT_CACHE_SERIALIZER = REDIS_CACHE_SERIALIZER
+
+# Lifetime of cached courses and lessons responses in seconds
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -127,6 +208,17 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'static'
+
+# Static files are collected into the image with compressed copies and hashed names for far-future cache headers
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -144,25 +236,101 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS') == 'True'
 EMAIL_HOST_USER = os.getenv('GMAIL')
 EMAIL_HOST_PASSWORD = os.getenv('GMAIL_PASS')
 
+# Number of subscribers notified by one celery task about course update
+SUBSCRIPTION_MAIL_CHUNK_SIZE = 500
+
 AUTH_USER_MODEL = 'users.User'
 
+# Maximum number of lessons in one bulk create/update request
+LESSON_BULK_MAX_SIZE = 500
+
+# Thumbnails made of uploaded images, sizes by image field name
+THUMBNAIL_FIELDS = [
+    ('materials.Course', 'preview'),
+    ('materials.Lesson', 'preview'),
+    ('users.User', 'avatar'),
+]
+THUMBNAIL_SIZES = {
+    'preview': {'small': (320, 180), 'medium': (640, 360)},
+    'avatar': {'small': (64, 64), 'medium': (256, 256)},
+}
+THUMBNAIL_FORMATS = ('webp', 'jpeg')
+
+# Number of payments read by one fetch of the export cursor and sent in one chunk
+PAYMENTS_EXPORT_CHUNK_SIZE = 2000
+
+# Number of users, courses and lessons whose existence import_fixtures keeps in memory
+IMPORT_LOOKUP_CACHE_SIZE = 1000000
+
+# Number of courses and lessons in search results
+SEARCH_RESULTS_LIMIT = 20
+
+# Number of the most recent payments in user payment history
+USER_PAYMENT_HISTORY_SIZE = 10
+
+STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE', 'https://api.stripe.com')
+STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
+
+# Number of stripe webhook events turned into payments by one transaction
+STRIPE_EVENTS_BATCH_SIZE = 500
+
+# Stripe HTTP client: timeouts in seconds, retries with exponential backoff,
+# connection pool size and concurrent requests limit of the async client
+STRIPE_TIMEOUT = 10
+STRIPE_CONNECT_TIMEOUT = 3
+STRIPE_MAX_RETRIES = 2
+STRIPE_RETRY_BACKOFF = 0.5
+STRIPE_MAX_CONNECTIONS = 20
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     )
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=3),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.UserTokenObtainPairSerializer',
 }
 
+# Bearer token of the Prometheus scraper for /metrics
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Authenticate requests by role and status claims of the access token without loading the user,
+# claims are checked against the cached user to notice deactivated users
+JWT_TOKEN_USER = os.getenv('JWT_TOKEN_USER') == 'True'
+
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND')
 
+# Number of users deactivated by one UPDATE statement in check_last_session
+INACTIVE_USERS_BATCH_SIZE = 10000
+
+# Number of payments added to revenue rollups in one transaction
+REVENUE_ROLLUP_BATCH_SIZE = 10000
+
+# Number of courses whose counters are checked by one statement of reconciliation
+COURSE_COUNTERS_BATCH_SIZE = 1000
+
 CELERY_BEAT_SCHEDULE = {
     'check_last_session': {
         'task': 'materials.tasks.check_last_session',
         'schedule': timedelta(hours=24),
     },
+    'revenue_rollup': {
+        'task': 'materials.tasks.revenue_rollup',
+        'schedule': timedelta(hours=1),
+    },
+    # counters are updated with their objects, this fixes drift from updates bypassing them
+    'reconcile_course_counters': {
+        'task': 'materials.tasks.reconcile_course_counters',
+        'schedule': timedelta(hours=24),
+    },
+    # picks up events whose task was lost, webhooks schedule processing themselves
+    'process_stripe_events': {
+        'task': 'materials.tasks.process_stripe_events',
+        'schedule': timedelta(minutes=10),
+    },
 }
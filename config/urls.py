@@ -22,6 +22,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from monitoring.views import metrics
+
 schema_view = get_schema_view(
    openapi.Info(
       title="Snippets API",
@@ -40,6 +42,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('materials.urls', namespace='materials')),
     path('users/', include('users.urls', namespace='users')),
+    path('metrics', metrics, name='metrics'),
 
     # API documentation
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
@@ -0,0 +1,102 @@
+from io import StringIO
+from itertools import islice
+
+from django.db import connection
+from django.db.models import Max
+
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_value(value):
+    """
+    Value in PostgreSQL COPY text format.
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, str):
+        return value.translate(COPY_ESCAPES)
+    return str(value)
+
+
+def drop_indexes(cursor, table):
+    """
+    Drop foreign keys and non-unique indexes of the table and return statements which create them again.
+    """
+    cursor.execute(
+        'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = %s',
+        [table, 'f']
+    )
+    foreign_keys = cursor.fetchall()
+    cursor.execute(
+        'SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) FROM pg_index '
+        'WHERE indrelid = %s::regclass AND NOT indisunique',
+        [table]
+    )
+    indexes = cursor.fetchall()
+
+    for name, _ in foreign_keys:
+        cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX {name}')
+    return [definition for _, definition in indexes] + [
+        f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}' for name, definition in foreign_keys
+    ]
+
+
+def bulk_insert(model, fields, rows, batch_size=10000, use_copy=True, return_pks=False, rebuild_indexes=False):
+    """
+    Insert rows (tuples of database values of fields) in batches, return pks of inserted objects in rows order
+    if asked.
+
+    Rows are streamed by COPY on PostgreSQL and inserted by parameterized INSERT statements on other databases
+    or with `use_copy=False`.
+    Fields missing from `fields` get their defaults, calculated once for all rows.
+
+    With `rebuild_indexes` foreign keys and non-unique indexes are dropped before COPY and created again after it,
+    which is much faster for large inserts but locks the table until the end of the transaction.
+    """
+    fields = [model._meta.get_field(name) for name in fields]
+    defaults = {
+        field: field.get_default() for field in model._meta.concrete_fields
+        if field not in fields and not field.primary_key
+    }
+    last_pk = model.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+    rows = iter(rows)
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in [*fields, *defaults])
+
+    if use_copy and connection.vendor == 'postgresql':
+        sql = f'COPY {table} ({columns}) FROM STDIN'
+        tail = [copy_value(field.get_db_prep_save(value, connection)) for field, value in defaults.items()]
+
+        with connection.cursor() as cursor:
+            indexes = drop_indexes(cursor, model._meta.db_table) if rebuild_indexes else []
+            while batch := list(islice(rows, batch_size)):
+                data = StringIO()
+                for row in batch:
+                    data.write('\t'.join([*map(copy_value, row), *tail]) + '\n')
+                data.seek(0)
+                # errors of the psycopg2 method are not converted to the Django ones like those of execute()
+                with connection.wrap_database_errors:
+                    cursor.copy_expert(sql, data)
+            # one index build and one validating join instead of updates and checks for every row
+            for statement in indexes:
+                cursor.execute(statement)
+    else:
+        sql = f'INSERT INTO {table} ({columns}) VALUES ({", ".join(["%s"] * (len(fields) + len(defaults)))})'
+        tail = [field.get_db_prep_save(value, connection) for field, value in defaults.items()]
+
+        with connection.cursor() as cursor:
+            while batch := list(islice(rows, batch_size)):
+                # given values of auto_now fields are kept as COPY does, bulk_create would replace them
+                cursor.executemany(sql, [
+                    [*(field.get_db_prep_save(value, connection) for field, value in zip(fields, row)), *tail]
+                    for row in batch
+                ])
+
+    if return_pks:
+        # pks come from the sequence in insertion order
+        return list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True))
@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import OrderedDict
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from materials.models import Course
+from monitoring.metrics import CACHE_REQUESTS
+
+VERSION_KEY = 'materials:version:{}'
+TAG_VERSION_KEY = 'objects:tag:{}'
+
+
+def get_versions(*scopes):
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    return ':'.join(str(versions.get(key, 0)) for key in keys)
+
+
+def invalidate_responses(*scopes):
+    """
+    Make cached responses of scopes stale, new version changes all their cache keys.
+    """
+    cache.set_many({VERSION_KEY.format(scope): uuid4().hex for scope in scopes}, timeout=None)
+
+
+class CachedResponseMixin:
+    """
+    Cache serialized list and detail responses and answer conditional GET by ETag.
+
+    Responses are cached per user when `per_user` is set and per role otherwise,
+    `cache_scopes` name versions which are changed by signals on models writes. Only view permissions
+    are checked before a cached response is served, so per user responses are also keyed by the role
+    the object permissions depend on and are dropped when the user is saved.
+    """
+    cache_scopes = ()
+    per_user = False
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cache_scopes(self, request):
+        return self.cache_scopes
+
+    def get_response_cache_key(self, request):
+        user = request.user
+        user_key = f'role:{user.role}:{int(user.is_staff)}'
+        scopes = self.get_cache_scopes(request)
+        if self.per_user:
+            user_key = f'user:{user.pk}:{user_key}'
+            scopes = (*scopes, f'user:{user.pk}')
+        path = md5(request.get_full_path().encode()).hexdigest()
+        versions = get_versions(*scopes)
+        return f'materials:response:{self.__class__.__name__}:{user_key}:{versions}:{path}'
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key)
+
+        if cached is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+            etag = f'"{md5(JSONRenderer().render(response.data)).hexdigest()}"'
+            cached = (etag, response.data)
+            cache.set(key, cached, settings.RESPONSE_CACHE_TIMEOUT)
+
+        etag, data = cached
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+
+class LocalCache:
+    """
+    Bounded LRU cache of one process, entries live `timeout` seconds and can be dropped by tags.
+    """
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        # key -> (expires, tags, value)
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[2]
+
+    def set(self, key, value, tags):
+        with self.lock:
+            self.entries[key] = time.monotonic() + self.timeout, tags, value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def drop_tags(self, tags):
+        with self.lock:
+            for key in [key for key, (_, entry_tags, _) in self.entries.items() if entry_tags & tags]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TieredCache:
+    """
+    Cache of objects read on most requests: per-process LRU (L1) in front of the shared cache (L2).
+
+    L2 keys contain versions of the object tags, invalidating a tag changes its version in L2 and drops
+    its L1 entries in this process, L1 entries of other processes expire after OBJECT_CACHE_L1_TIMEOUT.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    @cached_property
+    def local(self):
+        return LocalCache(settings.OBJECT_CACHE_L1_MAX_ENTRIES, settings.OBJECT_CACHE_L1_TIMEOUT)
+
+    @cached_property
+    def serializer(self):
+        return import_string(settings.OBJECT_CACHE_SERIALIZER)()
+
+    def get_or_set(self, key, default, tags=()):
+        """
+        Return cached value of the key, call `default` and cache its result (None too) on miss.
+        """
+        if not settings.OBJECT_CACHE_ENABLED:
+            return default()
+
+        tags = frozenset(tags)
+        data = self.local.get(key)
+        CACHE_REQUESTS.labels(self.name, 'l1', 'miss' if data is None else 'hit').inc()
+
+        if data is None:
+            version_keys = [TAG_VERSION_KEY.format(tag) for tag in sorted(tags)]
+            versions = cache.get_many(version_keys)
+            shared_key = f'objects:{self.name}:{key}:' + ':'.join(
+                versions.get(version_key, '0') for version_key in version_keys
+            )
+            data = cache.get(shared_key)
+            CACHE_REQUESTS.labels(self.name, 'l2', 'miss' if data is None else 'hit').inc()
+
+            if data is None:
+                data = self.serializer.dumps(default())
+                cache.set(shared_key, data, settings.OBJECT_CACHE_TIMEOUT)
+            self.local.set(key, data, tags)
+
+        return self.serializer.loads(data)
+
+    def invalidate(self, *tags):
+        cache.set_many({TAG_VERSION_KEY.format(tag): uuid4().hex for tag in tags}, timeout=None)
+        self.local.drop_tags(frozenset(tags))
+
+
+course_cache = TieredCache('courses')
+
+
+def get_cached_course(pk):
+    """
+    Course from the object cache, None for missing courses.
+    """
+    return course_cache.get_or_set(pk, lambda: Course.objects.filter(pk=pk).first(), tags=[f'course:{pk}'])
@@ -0,0 +1,211 @@
+"""
+Incremental reading of fixtures and resolving their foreign keys for bulk imports.
+
+Files are read as bytes and positions are byte offsets, so an import continues from a position
+by seeking to it without reading the records before it.
+"""
+import codecs
+import io
+import json
+import re
+
+from django.apps import apps
+from django.db import models
+
+from materials.validators import get_youtube_video_id
+
+READ_SIZE = 1024 * 1024
+MAX_RECORD_SIZE = 16 * 1024 * 1024
+SEPARATORS = re.compile(r'[\s,]*')
+DECODER = json.JSONDecoder()
+
+IMPORT_MODELS = ('materials.course', 'materials.lesson', 'materials.payments')
+
+# fields calculated by save() of the model from another field, bulk inserts skip save()
+DERIVED_FIELDS = {
+    'materials.lesson': {'video_id': ('video_url', get_youtube_video_id)},
+}
+
+
+class FixtureError(ValueError):
+    pass
+
+
+def seek(file, position):
+    if position > file.seek(0, io.SEEK_END):
+        raise FixtureError('The file is shorter than the checkpoint')
+    file.seek(position)
+
+
+def decode(decoder, data):
+    try:
+        return decoder.decode(data)
+    except UnicodeDecodeError as error:
+        raise FixtureError(f'The file is not UTF-8: {error}')
+
+
+def iter_json_array(file, position=0):
+    """
+    (record, position after it) of a JSON array in a binary file, decoded one record at a time from the position.
+    """
+    seek(file, position)
+    # a part of the file may end in the middle of a multibyte character
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = decode(decoder, file.read(READ_SIZE))
+    # buffer[start] is at the position in the file
+    index = start = 0
+
+    if position == 0:
+        index = SEPARATORS.match(buffer).end()
+        if buffer[index:index + 1] != '[':
+            raise FixtureError('Expected a JSON array')
+        index += 1
+
+    while True:
+        index = SEPARATORS.match(buffer, index).end()
+        if buffer[index:index + 1] == ']':
+            return
+        try:
+            if index == len(buffer):
+                raise json.JSONDecodeError('Record is not complete', buffer, index)
+            record, end = DECODER.raw_decode(buffer, index)
+        except json.JSONDecodeError:
+            # the record continues in the next part of the file
+            position += len(buffer[start:index].encode())
+            more = file.read(READ_SIZE)
+            if not more or len(buffer) - index > MAX_RECORD_SIZE:
+                raise FixtureError(f'Invalid JSON at position {position}')
+            buffer = buffer[index:] + decode(decoder, more)
+            index = start = 0
+            continue
+        position += len(buffer[start:end].encode())
+        index = start = end
+        yield record, position
+
+
+def iter_ndjson(file, position=0):
+    """
+    (record, position after it) of a binary file with a JSON record on every line.
+    """
+    seek(file, position)
+    for line in file:
+        position += len(line)
+        if line.strip():
+            try:
+                yield json.loads(line), position
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                raise FixtureError(f'Invalid JSON on the line ending at position {position}')
+
+
+class RelatedLookup:
+    """
+    Existing primary keys of a related model by pk or natural key, unknown keys of a batch are loaded by one query.
+
+    Natural keys are one-element lists of USERNAME_FIELD for the user model, as dumpdata --natural-foreign writes them.
+    """
+
+    def __init__(self, model, max_size):
+        self.model = model
+        self.max_size = max_size
+        self.natural_key_field = getattr(model, 'USERNAME_FIELD', None)
+        self.known = {}
+
+    def key(self, value):
+        if isinstance(value, list):
+            if self.natural_key_field is None or len(value) != 1:
+                raise FixtureError(f'Unsupported natural key {value} of {self.model._meta.label}')
+            return 'natural', value[0]
+        return 'pk', self.model._meta.pk.to_python(value)
+
+    def load(self, values):
+        if len(self.known) > self.max_size:
+            self.known.clear()
+
+        unknown = {self.key(value) for value in values} - self.known.keys()
+        pks = {key for kind, key in unknown if kind == 'pk'}
+        natural_keys = {key for kind, key in unknown if kind == 'natural'}
+        self.known.update(dict.fromkeys(unknown))
+
+        if pks:
+            self.known.update(
+                (('pk', pk), pk) for pk in self.model._base_manager.filter(pk__in=pks).values_list('pk', flat=True)
+            )
+        if natural_keys:
+            self.known.update(
+                (('natural', key), pk) for key, pk in self.model._base_manager.filter(
+                    **{f'{self.natural_key_field}__in': natural_keys}
+                ).values_list(self.natural_key_field, 'pk')
+            )
+
+    def add(self, pks):
+        self.known.update((('pk', pk), pk) for pk in pks)
+
+    def get(self, value):
+        """
+        Primary key of the related object, None if it doesn't exist.
+        """
+        return self.known.get(self.key(value))
+
+
+def get_import_model(label):
+    try:
+        model = apps.get_model(label)
+    except (LookupError, ValueError):
+        raise FixtureError(f'Unknown model {label}')
+    if model._meta.label_lower not in IMPORT_MODELS:
+        raise FixtureError(f'Import of {label} is not supported')
+    return model
+
+
+def build_rows(model, records, lookups, keep_pks):
+    """
+    Fields and rows of database values of the records, records with missing related objects are skipped.
+
+    Records are (pk, fields) pairs. Fields missing in a record get defaults, auto_now fields get the current time.
+    Non-editable fields are calculated by the model instead of being imported.
+    """
+    names = {name for _, values in records for name in values}
+    derived = DERIVED_FIELDS.get(model._meta.label_lower, {})
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key and (field.editable and field.name in names or field.name in derived
+                                      or getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False))
+    ]
+    if keep_pks:
+        fields.insert(0, model._meta.pk)
+
+    defaults = {}
+    for field in fields:
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            defaults[field.name] = field.pre_save(model(), add=True)
+        else:
+            defaults[field.name] = field.get_default()
+
+    for field in fields:
+        if isinstance(field, models.ForeignKey):
+            lookups[field.related_model].load(
+                [values[field.name] for _, values in records if values.get(field.name) is not None]
+            )
+
+    rows, skipped = [], 0
+    for pk, values in records:
+        row = {}
+        for field in fields:
+            if field.primary_key:
+                row[field.name] = field.to_python(pk)
+            elif field.name in derived:
+                source, calculate = derived[field.name]
+                row[field.name] = calculate(values.get(source))
+            elif field.name not in values:
+                row[field.name] = defaults[field.name]
+            elif isinstance(field, models.ForeignKey) and values[field.name] is not None:
+                row[field.name] = lookups[field.related_model].get(values[field.name])
+                if row[field.name] is None:
+                    skipped += 1
+                    break
+            else:
+                row[field.name] = field.to_python(values[field.name])
+        else:
+            rows.append(tuple(row.values()))
+
+    return [field.name for field in fields], rows, skipped
@@ -0,0 +1,41 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management import BaseCommand
+from django.db import connections
+from PIL import Image
+
+from materials.thumbnails import get_stale_thumbnails, make_thumbnails
+
+
+def make_image_thumbnails(image):
+    model_label, pk, field_name = image
+    try:
+        return make_thumbnails(model_label, pk, field_name)
+    except (OSError, Image.DecompressionBombError, ValueError):
+        # missing, broken or too large image file, the others are made anyway
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Make thumbnails of uploaded images without them in a pool of processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--chunk-size', type=int, default=10, help='images sent to a worker at once')
+
+    def handle(self, *args, **options):
+        images = list(get_stale_thumbnails())
+        # forked workers must open their own connections instead of sharing ones of this process
+        connections.close_all()
+
+        made = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            for result in pool.map(make_image_thumbnails, images, chunksize=options['chunk_size']):
+                if result is None:
+                    failed += 1
+                else:
+                    made += result
+
+        self.stdout.write(f'thumbnails: {made} images, {failed} failed of {len(images)}')
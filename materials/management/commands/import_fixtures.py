@@ -0,0 +1,132 @@
+import os
+import time
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+
+from materials.bulk import bulk_insert
+from materials.caching import course_cache, invalidate_responses
+from materials.imports import FixtureError, RelatedLookup, build_rows, get_import_model, iter_json_array, iter_ndjson
+from materials.models import Course, ImportCheckpoint, Lesson
+
+
+class Command(BaseCommand):
+    help = 'Import courses, lessons and payments from a large JSON or NDJSON fixture in batches, resumable'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['json', 'ndjson'], help='by the file extension by default')
+        parser.add_argument('--model', help='label of the model when records are plain fields, not fixture objects')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--new-pks', action='store_true',
+                            help='ignore pks of the records, for dumps of another database nothing refers to')
+        parser.add_argument('--restart', action='store_true', help='start from the beginning instead of the checkpoint')
+        parser.add_argument('--no-copy', action='store_true', help='use INSERT instead of COPY')
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        file_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'json')
+        model = get_import_model(options['model']) if options['model'] else None
+
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=path)
+        if options['restart']:
+            checkpoint.position = checkpoint.records = 0
+        elif checkpoint.position:
+            self.stdout.write(f'resuming after {checkpoint.records} records')
+
+        lookups = {
+            related_model: RelatedLookup(related_model, settings.IMPORT_LOOKUP_CACHE_SIZE)
+            for related_model in (get_user_model(), Course, Lesson)
+        }
+        started = time.perf_counter()
+        imported = skipped = 0
+
+        with open(path, 'rb') as file:
+            read = iter_ndjson if file_format == 'ndjson' else iter_json_array
+            records = read(file, checkpoint.position)
+            try:
+                while batch := list(islice(records, options['batch_size'])):
+                    groups = self.group_records(batch, model)
+                    with transaction.atomic():
+                        for batch_model, batch_records in groups.items():
+                            keep_pks = not options['new_pks'] and all(pk is not None for pk, _ in batch_records)
+                            fields, rows, batch_skipped = build_rows(batch_model, batch_records, lookups, keep_pks)
+                            bulk_insert(batch_model, fields, rows, batch_size=options['batch_size'],
+                                        use_copy=not options['no_copy'])
+                            imported += len(rows)
+                            skipped += batch_skipped
+
+                            if batch_model is Lesson and 'course' in fields:
+                                # bulk inserts skip counting by signals
+                                course_index = fields.index('course')
+                                Course.objects.add_to_counter('lessons_count',
+                                                              Counter(row[course_index] for row in rows))
+
+                            if keep_pks:
+                                pks = [row[0] for row in rows]
+                                self.reset_sequence(batch_model)
+                                if batch_model in lookups:
+                                    # later records may refer to objects of this batch
+                                    lookups[batch_model].add(pks)
+                                if batch_model is Course:
+                                    # missing courses are cached too
+                                    course_cache.invalidate(*(f'course:{pk}' for pk in pks))
+
+                        # the checkpoint is committed with the rows, a resumed import doesn't repeat them
+                        checkpoint.position = batch[-1][1]
+                        checkpoint.records += len(batch)
+                        checkpoint.save()
+
+                    if {Course, Lesson} & groups.keys():
+                        # bulk inserts skip signals
+                        invalidate_responses('course', 'lesson')
+                    self.report(checkpoint.records, imported, skipped, started)
+            except FixtureError as error:
+                raise CommandError(f'{error}, {checkpoint.records} records are imported, run again to resume')
+            except IntegrityError as error:
+                # the batch is rolled back, the checkpoint stays before it
+                raise CommandError(
+                    f'Records of {path} after the checkpoint at {checkpoint.records} records '
+                    f'(byte {checkpoint.position}) conflict with existing rows, use --new-pks for records '
+                    f'nothing refers to: {str(error).strip()}'
+                )
+
+        self.stdout.write(f'done: {imported} imported, {skipped} skipped in {time.perf_counter() - started:.1f}s')
+
+    @staticmethod
+    def group_records(batch, model):
+        """
+        (pk, fields) of the records by model in order of appearance.
+        """
+        groups, models = {}, {}
+        for record, _ in batch:
+            if not isinstance(record, dict):
+                raise FixtureError(f'Expected an object, got {record!r}')
+            if model is not None:
+                fields = dict(record)
+                pk = fields.pop('pk', fields.pop('id', None))
+                groups.setdefault(model, []).append((pk, fields))
+            else:
+                label = record.get('model', '')
+                if label not in models:
+                    models[label] = get_import_model(label)
+                record_model = models[label]
+                groups.setdefault(record_model, []).append((record.get('pk'), record.get('fields', {})))
+        return groups
+
+    @staticmethod
+    def reset_sequence(model):
+        # rows with given pks don't move the sequence, new objects would get taken pks
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                cursor.execute(sql)
+
+    def report(self, records, imported, skipped, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'records: {records}, imported {imported}, skipped {skipped} '
+                          f'({elapsed:.1f}s, {imported / elapsed:.0f} rows/s)')
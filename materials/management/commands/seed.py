@@ -0,0 +1,109 @@
+import random
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from materials.bulk import bulk_insert
+from materials.caching import invalidate_responses
+from materials.models import Course, Lesson, Payments, Subscription
+from users.models import User, UserRole
+
+MODERATORS_SHARE = 0.1
+PAYMENT_DAYS = 730
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with generated users, courses, lessons, subscriptions and payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--courses', type=int, default=100)
+        parser.add_argument('--lessons-per-course', type=int, default=10)
+        parser.add_argument('--subscriptions', type=int, default=10000)
+        parser.add_argument('--payments', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0, help='same seed generates the same data')
+        parser.add_argument('--password', default='qwe123', help='password of all generated users')
+        parser.add_argument('--batch-size', type=int, default=50000)
+        parser.add_argument('--no-copy', action='store_true', help='use INSERT instead of COPY')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        email = 'user{}.seed' + str(options['seed']) + '@seed.ru'
+        if User.objects.filter(email=email.format(0)).exists():
+            raise CommandError(f'Data of seed {options["seed"]} already exists')
+        if options['payments'] and not (options['users'] and options['courses']):
+            raise CommandError('Payments need users and courses')
+
+        insert_options = {
+            'batch_size': options['batch_size'],
+            'use_copy': not options['no_copy'],
+            'rebuild_indexes': True,
+        }
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            # hashing is slow by design, all users share one hash
+            password = make_password(options['password'])
+            users = bulk_insert(
+                User, ['email', 'password', 'role', 'is_active'],
+                ((email.format(i), password,
+                  UserRole.MODERATOR if rng.random() < MODERATORS_SHARE else UserRole.MEMBER, True)
+                 for i in range(options['users'])),
+                return_pks=True, **insert_options
+            )
+            self.report('users', len(users), started)
+
+            owners = [rng.choice(users) for _ in range(options['courses'])]
+            courses = bulk_insert(
+                Course, ['title', 'description', 'price', 'owner_id', 'lessons_count'],
+                ((f'Курс {i}', f'Описание курса {i}', rng.randint(100, 10000), owner, options['lessons_per_course'])
+                 for i, owner in enumerate(owners)),
+                return_pks=True, **insert_options
+            )
+            self.report('courses', len(courses), started)
+
+            lessons = bulk_insert(
+                Lesson, ['title', 'description', 'price', 'course_id', 'owner_id'],
+                ((f'Урок {i}', f'Описание урока {i}', rng.randint(10, 1000), course, owner)
+                 for course, owner in zip(courses, owners) for i in range(options['lessons_per_course'])),
+                return_pks=True, **insert_options
+            )
+            self.report('lessons', len(lessons), started)
+
+            pairs = set()
+            while len(pairs) < min(options['subscriptions'], len(users) * len(courses)):
+                pairs.add((rng.choice(users), rng.choice(courses)))
+            bulk_insert(Subscription, ['user_id', 'course_id'], sorted(pairs), **insert_options)
+            self.report('subscriptions', len(pairs), started)
+
+            methods = [method for method, _ in Payments.PAYMENT_METHOD]
+            first_date = date.today() - timedelta(days=PAYMENT_DAYS)
+            bulk_insert(
+                Payments, ['user_id', 'paid_course_id', 'paid_lesson_id', 'amount', 'payment_method', 'payment_date'],
+                self.generate_payments(rng, options['payments'], users, courses, lessons, methods, first_date),
+                **insert_options
+            )
+            self.report('payments', options['payments'], started)
+
+            # after all COPY, updated rows would keep rebuild of foreign keys from altering the tables
+            Course.objects.add_to_counter('subscribers_count', Counter(course for _, course in pairs))
+
+        # bulk inserts skip signals
+        invalidate_responses('course', 'lesson')
+
+    @staticmethod
+    def generate_payments(rng, count, users, courses, lessons, methods, first_date):
+        for _ in range(count):
+            if lessons and rng.random() < 0.5:
+                paid_course, paid_lesson = None, rng.choice(lessons)
+            else:
+                paid_course, paid_lesson = rng.choice(courses), None
+            yield (rng.choice(users), paid_course, paid_lesson, rng.randint(10, 10000), rng.choice(methods),
+                   first_date + timedelta(days=rng.randrange(PAYMENT_DAYS)))
+
+    def report(self, name, count, started):
+        self.stdout.write(f'{name}: {count} ({time.perf_counter() - started:.1f}s)')
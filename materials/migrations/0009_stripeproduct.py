@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0008_course_price_lesson_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.CharField(max_length=255, verbose_name='id продукта в stripe')),
+                ('price_id', models.CharField(max_length=255, verbose_name='id цены в stripe')),
+                ('title', models.CharField(max_length=150, verbose_name='название')),
+                ('price', models.PositiveIntegerField(verbose_name='цена')),
+                ('course', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stripe_product', to='materials.course', verbose_name='курс')),
+                ('lesson', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stripe_product', to='materials.lesson', verbose_name='урок')),
+            ],
+            options={
+                'verbose_name': 'продукт stripe',
+                'verbose_name_plural': 'продукты stripe',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0009_stripeproduct'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='название')),
+                ('last_pk', models.BigIntegerField(default=0, verbose_name='последний обработанный pk')),
+            ],
+            options={
+                'verbose_name': 'отметка обработки',
+                'verbose_name_plural': 'отметки обработки',
+            },
+        ),
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='дата')),
+                ('payment_method', models.CharField(choices=[('наличные', 'наличные'), ('перевод на счет', 'перевод на счет')], max_length=150, verbose_name='способ оплаты')),
+                ('amount', models.PositiveBigIntegerField(default=0, verbose_name='выручка')),
+                ('payments_count', models.PositiveIntegerField(default=0, verbose_name='количество платежей')),
+                ('paid_course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='revenue', to='materials.course', verbose_name='оплаченный курс')),
+                ('paid_lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='revenue', to='materials.lesson', verbose_name='оплаченный урок')),
+            ],
+            options={
+                'verbose_name': 'выручка за день',
+                'verbose_name_plural': 'выручка по дням',
+                'indexes': [models.Index(fields=['date'], name='materials_revenue_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:48
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_subscriptions(apps, schema_editor):
+    Subscription = apps.get_model('materials', 'Subscription')
+    duplicates = Subscription.objects.values('user', 'course').annotate(
+        first_pk=Min('pk'), count=Count('pk')
+    ).filter(count__gt=1)
+
+    for duplicate in duplicates:
+        Subscription.objects.filter(
+            user=duplicate['user'], course=duplicate['course']
+        ).exclude(pk=duplicate['first_pk']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0010_rollupwatermark_revenuerollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payments',
+            index=models.Index(fields=['payment_date', 'id'], name='materials_payments_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payments',
+            index=models.Index(fields=['paid_course', 'payment_date'], include=('amount',), name='materials_payments_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payments',
+            index=models.Index(fields=['paid_lesson', 'payment_date'], include=('amount',), name='materials_payments_lesson_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payments',
+            index=models.Index(fields=['payment_method', 'payment_date'], name='materials_payments_method_idx'),
+        ),
+        migrations.RunPython(delete_duplicate_subscriptions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('user', 'course'), name='materials_subscription_user_course_unique'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:07
+
+import re
+
+from django.db import migrations, models, transaction
+
+YOUTUBE_URL = re.compile(r"^(?:https?://)?(?:www\.)?youtube\.com/watch[?]v=(?P<video_id>[a-zA-Z0-9_-]+)")
+BATCH_SIZE = 1000
+
+
+def backfill_video_id(apps, schema_editor):
+    Lesson = apps.get_model('materials', 'Lesson')
+    lessons = Lesson.objects.filter(video_url__isnull=False).order_by('pk').only('pk', 'video_url')
+
+    last_pk = 0
+    while batch := list(lessons.filter(pk__gt=last_pk)[:BATCH_SIZE]):
+        for lesson in batch:
+            match = YOUTUBE_URL.match(lesson.video_url)
+            lesson.video_id = match['video_id'] if match else None
+        # short transaction per batch instead of locking the whole table until the end
+        with transaction.atomic():
+            Lesson.objects.bulk_update(batch, ['video_id'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('materials', '0011_payments_materials_payments_date_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='video_id',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=200, null=True, verbose_name='id видео на YouTube'),
+        ),
+        migrations.RunPython(backfill_video_id, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0012_lesson_video_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payments',
+            name='stripe_session_id',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True, verbose_name='id сессии оплаты в stripe'),
+        ),
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True, verbose_name='id события в stripe')),
+                ('type', models.CharField(max_length=100, verbose_name='тип события')),
+                ('payload', models.JSONField(verbose_name='событие')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='получено')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='обработано')),
+            ],
+            options={
+                'verbose_name': 'событие stripe',
+                'verbose_name_plural': 'события stripe',
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='materials_stripeevent_new_idx')],
+            },
+        ),
+    ]
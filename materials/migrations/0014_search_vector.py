@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:24
+
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(description, '')), 'B')"
+)
+TABLES = ('materials_course', 'materials_lesson')
+
+
+def add_search_vectors(apps, schema_editor):
+    # other databases use substring search of materials.search without the column
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        # generated by the database on every insert and update, including bulk inserts and COPY
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD COLUMN search_vector tsvector '
+            f'GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED'
+        )
+        schema_editor.execute(f'CREATE INDEX {table}_search_idx ON {table} USING gin (search_vector)')
+
+
+def remove_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(f'ALTER TABLE {table} DROP COLUMN search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0013_stripeevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vectors, remove_search_vectors),
+    ]
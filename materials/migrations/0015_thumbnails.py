@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0014_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='preview_thumbnails',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='миниатюры превью'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='preview_thumbnails',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='миниатюры превью'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0015_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=500, unique=True, verbose_name='файл')),
+                ('position', models.BigIntegerField(default=0, verbose_name='позиция в файле')),
+                ('records', models.BigIntegerField(default=0, verbose_name='обработано записей')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='обновлено')),
+            ],
+            options={
+                'verbose_name': 'отметка импорта',
+                'verbose_name_plural': 'отметки импорта',
+            },
+        ),
+    ]
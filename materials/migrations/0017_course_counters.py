@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:43
+
+from django.db import migrations, models, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def count_course_objects(model):
+    return Coalesce(Subquery(
+        model.objects.filter(course=OuterRef('pk')).order_by().values('course').annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Course = apps.get_model('materials', 'Course')
+    courses = Course.objects.order_by('pk').values_list('pk', flat=True)
+
+    last_pk = 0
+    while batch := list(courses.filter(pk__gt=last_pk)[:BATCH_SIZE]):
+        # short transaction per batch instead of locking the whole table until the end
+        with transaction.atomic():
+            Course.objects.filter(pk__gte=batch[0], pk__lte=batch[-1]).update(
+                lessons_count=count_course_objects(apps.get_model('materials', 'Lesson')),
+                subscribers_count=count_course_objects(apps.get_model('materials', 'Subscription')),
+            )
+        last_pk = batch[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('materials', '0016_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lessons_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество уроков'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество подписчиков'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['subscribers_count', 'id'], name='materials_course_subs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['lessons_count', 'id'], name='materials_course_lessons_idx'),
+        ),
+    ]
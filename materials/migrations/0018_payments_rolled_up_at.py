@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:01
+
+from django.db import migrations, models, transaction
+from django.db.models import Count, Sum
+import django.db.models.functions.comparison
+from django.utils import timezone
+
+BATCH_SIZE = 10000
+
+
+def mark_rolled_up(apps, schema_editor):
+    RollupWatermark = apps.get_model('materials', 'RollupWatermark')
+    Payments = apps.get_model('materials', 'Payments')
+    watermark = RollupWatermark.objects.filter(name='revenue').first()
+    if watermark is None:
+        return
+
+    # payments up to the watermark are already in the rollups
+    now = timezone.now()
+    for start in range(0, watermark.last_pk, BATCH_SIZE):
+        with transaction.atomic():
+            Payments.objects.filter(pk__gt=start, pk__lte=min(start + BATCH_SIZE, watermark.last_pk)).update(
+                rolled_up_at=now
+            )
+
+
+def merge_rollups(apps, schema_editor):
+    RevenueRollup = apps.get_model('materials', 'RevenueRollup')
+    duplicates = RevenueRollup.objects.values(
+        'date', 'paid_course', 'paid_lesson', 'payment_method'
+    ).annotate(
+        total=Sum('amount'), payments=Sum('payments_count'), count=Count('pk')
+    ).filter(count__gt=1).order_by()
+
+    for duplicate in duplicates:
+        with transaction.atomic():
+            rollups = list(RevenueRollup.objects.filter(
+                date=duplicate['date'], paid_course=duplicate['paid_course'], paid_lesson=duplicate['paid_lesson'],
+                payment_method=duplicate['payment_method']
+            ).order_by('pk'))
+            rollup = rollups[0]
+            rollup.amount, rollup.payments_count = duplicate['total'], duplicate['payments']
+            rollup.save()
+            RevenueRollup.objects.filter(pk__in=[other.pk for other in rollups[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('materials', '0017_course_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payments',
+            name='rolled_up_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='учтен в выручке'),
+        ),
+        migrations.RunPython(mark_rolled_up, migrations.RunPython.noop),
+        migrations.RunPython(merge_rollups, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='RollupWatermark',
+        ),
+        migrations.AddIndex(
+            model_name='payments',
+            index=models.Index(condition=models.Q(('rolled_up_at__isnull', True)), fields=['id'], name='materials_payments_new_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(models.F('date'), django.db.models.functions.comparison.Coalesce('paid_course', 0), django.db.models.functions.comparison.Coalesce('paid_lesson', 0), models.F('payment_method'), name='materials_revenue_unique'),
+        ),
+    ]
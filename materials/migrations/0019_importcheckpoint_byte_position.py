@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+READ_SIZE = 1024 * 1024
+
+
+def convert_positions(apps, schema_editor):
+    ImportCheckpoint = apps.get_model('materials', 'ImportCheckpoint')
+    for checkpoint in ImportCheckpoint.objects.filter(position__gt=0):
+        try:
+            # positions were counted in characters of the file opened in text mode
+            with open(checkpoint.source, encoding='utf-8') as file:
+                remaining = checkpoint.position
+                while remaining > 0 and (chunk := file.read(min(remaining, READ_SIZE))):
+                    remaining -= len(chunk)
+                checkpoint.position = file.tell()
+        except (OSError, ValueError):
+            # the file can't be read anymore, an import of it starts over
+            checkpoint.position = checkpoint.records = 0
+        checkpoint.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0018_payments_rolled_up_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importcheckpoint',
+            name='position',
+            field=models.BigIntegerField(default=0, verbose_name='позиция в файле, байт'),
+        ),
+        migrations.RunPython(convert_positions, migrations.RunPython.noop),
+    ]
@@ -1,38 +1,153 @@
+from collections import Counter, defaultdict
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from materials.validators import get_youtube_video_id
 
 NULLABLE = {'blank': True, 'null': True}
 
 
+class CourseQuerySet(models.QuerySet):
+
+    def add_to_counter(self, field, counts):
+        """
+        Add numbers of created (negative for deleted) objects by course pk to a counter field of courses.
+        """
+        pks_by_delta = defaultdict(list)
+        for pk, delta in counts.items():
+            if pk is not None and delta:
+                pks_by_delta[delta].append(pk)
+
+        # relative update is atomic without reading the counter, one query for courses with the same change
+        for delta, pks in pks_by_delta.items():
+            self.filter(pk__in=pks).update(**{field: Greatest(F(field) + delta, 0)})
+
+    def recount(self):
+        """
+        Set counters of the courses to the numbers of their lessons and subscribers, return number of corrected courses.
+        """
+        counts = {
+            model.course_counter: Coalesce(Subquery(
+                model.objects.filter(course=OuterRef('pk')).order_by().values('course').annotate(
+                    count=Count('pk')
+                ).values('count')
+            ), 0)
+            for model in (Lesson, Subscription)
+        }
+        return self.exclude(**counts).update(**counts)
+
+
+class CourseCountedQuerySet(models.QuerySet):
+    """
+    Objects counted by `course_counter` field of their course, bulk queries keep the counter.
+
+    Single objects are counted by signals, update() of course is left to reconciliation.
+    """
+
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False, update_conflicts=False, update_fields=None,
+                    unique_fields=None):
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, batch_size, ignore_conflicts, update_conflicts, update_fields,
+                                       unique_fields)
+            course_pks = [obj.course_id for obj in objs if obj.course_id is not None]
+            if ignore_conflicts or update_conflicts:
+                # which objects are inserted is unknown
+                Course.objects.filter(pk__in=set(course_pks)).recount()
+            else:
+                Course.objects.add_to_counter(self.model.course_counter, Counter(course_pks))
+        return objs
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if 'course' not in fields and 'course_id' not in fields:
+            return super().bulk_update(objs, fields, batch_size)
+
+        objs = list(objs)
+        counts = Counter(obj.course_id for obj in objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            counts.subtract(
+                self.filter(pk__in=[obj.pk for obj in objs]).select_for_update().values_list('course_id', flat=True)
+            )
+            rows = super().bulk_update(objs, fields, batch_size)
+            Course.objects.add_to_counter(self.model.course_counter, counts)
+        return rows
+
+
 class Course(models.Model):
     title = models.CharField(max_length=150, verbose_name='название')
     preview = models.ImageField(upload_to='course/', verbose_name='превью', **NULLABLE)
+    preview_thumbnails = models.JSONField(verbose_name='миниатюры превью', editable=False, **NULLABLE)
     description = models.TextField(verbose_name='описание')
     price = models.PositiveIntegerField(default=100, verbose_name='цена')
+    lessons_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='количество уроков')
+    subscribers_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='количество подписчиков')
 
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='владелец', **NULLABLE)
 
+    objects = CourseQuerySet.as_manager()
+
     def __str__(self):
         return f'{self.title}'
 
     class Meta:
         verbose_name = 'курс'
         verbose_name_plural = 'курсы'
+        indexes = [
+            # catalog ordered by popularity, both directions
+            models.Index(fields=['subscribers_count', 'id'], name='materials_course_subs_idx'),
+            models.Index(fields=['lessons_count', 'id'], name='materials_course_lessons_idx'),
+        ]
 
 
-class Lesson(models.Model):
+class CourseCountedModel(models.Model):
+    """
+    Remembers the course an object was loaded with, to move it between counters of courses when it changes.
+    """
+    course_counter = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'course_id' in instance.__dict__:
+            instance._loaded_course_id = instance.course_id
+        return instance
+
+    class Meta:
+        abstract = True
+
+
+class Lesson(CourseCountedModel):
+    course_counter = 'lessons_count'
+
     title = models.CharField(max_length=150, verbose_name='название')
     description = models.TextField(verbose_name='описание')
     preview = models.ImageField(upload_to='lesson/', verbose_name='превью', **NULLABLE)
+    preview_thumbnails = models.JSONField(verbose_name='миниатюры превью', editable=False, **NULLABLE)
     video_url = models.URLField(max_length=200, verbose_name='ссылка на видео', **NULLABLE)
+    video_id = models.CharField(max_length=200, verbose_name='id видео на YouTube', db_index=True, editable=False,
+                                **NULLABLE)
     price = models.PositiveIntegerField(default=50, verbose_name='цена')
 
     course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name='курс', **NULLABLE, related_name='lesson')
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='владелец', **NULLABLE)
 
+    objects = CourseCountedQuerySet.as_manager()
+
     def __str__(self):
         return f'{self.title}'
 
+    def set_video_id(self):
+        self.video_id = get_youtube_video_id(self.video_url)
+
+    def save(self, *args, **kwargs):
+        self.set_video_id()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'video_url' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'video_id'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'урок'
         verbose_name_plural = 'уроки'
@@ -52,6 +167,9 @@ class Payments(models.Model):
                                     related_name='payment')
     amount = models.PositiveIntegerField(verbose_name='сумма оплаты')
     payment_method = models.CharField(max_length=150, choices=PAYMENT_METHOD, verbose_name='способ оплаты')
+    stripe_session_id = models.CharField(max_length=255, unique=True, verbose_name='id сессии оплаты в stripe',
+                                         **NULLABLE)
+    rolled_up_at = models.DateTimeField(editable=False, verbose_name='учтен в выручке', **NULLABLE)
 
     def __str__(self):
         return f'{self.paid_course if self.paid_course else self.paid_lesson} - {self.amount}₽'
@@ -59,17 +177,113 @@ class Payments(models.Model):
     class Meta:
         verbose_name = 'платеж'
         verbose_name_plural = 'платежи'
+        indexes = [
+            models.Index(fields=['payment_date', 'id'], name='materials_payments_date_idx'),
+            models.Index(fields=['paid_course', 'payment_date'], include=['amount'],
+                         name='materials_payments_course_idx'),
+            models.Index(fields=['paid_lesson', 'payment_date'], include=['amount'],
+                         name='materials_payments_lesson_idx'),
+            models.Index(fields=['payment_method', 'payment_date'], name='materials_payments_method_idx'),
+            models.Index(fields=['id'], condition=models.Q(rolled_up_at__isnull=True),
+                         name='materials_payments_new_idx'),
+        ]
+
 
+class RevenueRollup(models.Model):
+    date = models.DateField(verbose_name='дата')
+    paid_course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name='оплаченный курс', **NULLABLE,
+                                    related_name='revenue')
+    paid_lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, verbose_name='оплаченный урок', **NULLABLE,
+                                    related_name='revenue')
+    payment_method = models.CharField(max_length=150, choices=Payments.PAYMENT_METHOD, verbose_name='способ оплаты')
+    amount = models.PositiveBigIntegerField(default=0, verbose_name='выручка')
+    payments_count = models.PositiveIntegerField(default=0, verbose_name='количество платежей')
+
+    def __str__(self):
+        return f'{self.date} {self.paid_course if self.paid_course else self.paid_lesson} - {self.amount}₽'
+
+    class Meta:
+        verbose_name = 'выручка за день'
+        verbose_name_plural = 'выручка по дням'
+        indexes = [
+            models.Index(fields=['date'], name='materials_revenue_date_idx'),
+        ]
+        constraints = [
+            # one of the materials is null, nulls are not equal in a plain unique constraint
+            models.UniqueConstraint('date', Coalesce('paid_course', 0), Coalesce('paid_lesson', 0), 'payment_method',
+                                    name='materials_revenue_unique'),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    source = models.CharField(max_length=500, unique=True, verbose_name='файл')
+    position = models.BigIntegerField(default=0, verbose_name='позиция в файле, байт')
+    records = models.BigIntegerField(default=0, verbose_name='обработано записей')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='обновлено')
+
+    def __str__(self):
+        return f'{self.source} - {self.records}'
+
+    class Meta:
+        verbose_name = 'отметка импорта'
+        verbose_name_plural = 'отметки импорта'
+
+
+class Subscription(CourseCountedModel):
+    course_counter = 'subscribers_count'
 
-class Subscription(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='пользователь',
                              **NULLABLE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name='курс', **NULLABLE,
                                related_name='subscription')
 
+    objects = CourseCountedQuerySet.as_manager()
+
     def __str__(self):
         return f'{self.user} подписан на {self.course}'
 
     class Meta:
         verbose_name = 'подписка'
         verbose_name_plural = 'подписки'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'course'], name='materials_subscription_user_course_unique'),
+        ]
+
+
+class StripeProduct(models.Model):
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, verbose_name='курс', **NULLABLE,
+                                  related_name='stripe_product')
+    lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, verbose_name='урок', **NULLABLE,
+                                  related_name='stripe_product')
+    product_id = models.CharField(max_length=255, verbose_name='id продукта в stripe')
+    price_id = models.CharField(max_length=255, verbose_name='id цены в stripe')
+
+    # title and price the stripe product and price were created for
+    title = models.CharField(max_length=150, verbose_name='название')
+    price = models.PositiveIntegerField(verbose_name='цена')
+
+    def __str__(self):
+        return f'{self.course if self.course else self.lesson} - {self.product_id}'
+
+    class Meta:
+        verbose_name = 'продукт stripe'
+        verbose_name_plural = 'продукты stripe'
+
+
+class StripeEvent(models.Model):
+    event_id = models.CharField(max_length=255, unique=True, verbose_name='id события в stripe')
+    type = models.CharField(max_length=100, verbose_name='тип события')
+    payload = models.JSONField(verbose_name='событие')
+    received_at = models.DateTimeField(auto_now_add=True, verbose_name='получено')
+    processed_at = models.DateTimeField(verbose_name='обработано', **NULLABLE)
+
+    def __str__(self):
+        return f'{self.type} {self.event_id}'
+
+    class Meta:
+        verbose_name = 'событие stripe'
+        verbose_name_plural = 'события stripe'
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True),
+                         name='materials_stripeevent_new_idx'),
+        ]
@@ -1,7 +1,138 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import b64decode, b64encode
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.utils.urls import replace_query_param, remove_query_param
 
 
 class MyPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination by (ordering field, pk), without COUNT(*) and OFFSET.
+
+    The cursor holds values of the ordering fields for the last (or first) object of the page,
+    so every page is an index range scan whatever its depth.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = 'pk'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for filter_cls in getattr(view, 'filter_backends', []):
+            if hasattr(filter_cls, 'get_ordering'):
+                ordering = filter_cls().get_ordering(request, queryset, view)
+                break
+
+        ordering = ordering or self.ordering
+        ordering = (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+        # pk makes position unique, it follows direction of the first field
+        if ordering[-1].lstrip('-') not in ('pk', 'id'):
+            ordering += ('-pk' if ordering[0].startswith('-') else 'pk',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.get_keyset_filter(ordering, position))
+            except (ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        return self.page
+
+    def get_keyset_filter(self, ordering, position):
+        """
+        Rows following position: (a > x) OR (a = x AND b > y) for ordering (a, b), position (x, y).
+        """
+        fields = [(field.lstrip('-'), 'lt' if field.startswith('-') else 'gt') for field in ordering]
+
+        conditions = []
+        for index, (field, lookup) in enumerate(fields):
+            equal = {name: value for (name, _), value in zip(fields[:index], position)}
+            conditions.append(Q(**equal, **{f'{field}__{lookup}': position[index]}))
+
+        # leading field range lets the database use index on it
+        first_field, first_lookup = fields[0]
+        return Q(**{f'{first_field}__{first_lookup}e': position[0]}) & reduce(or_, conditions)
+
+    def get_position(self, instance):
+        opts = instance._meta
+        position = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            attname = opts.pk.attname if name == 'pk' else opts.get_field(name).attname
+            position.append(getattr(instance, attname))
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor((self.get_position(self.page[-1]), False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor((self.get_position(self.page[0]), True))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')).decode('ascii'))
+            position, reverse = cursor['p'], bool(cursor['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, cursor):
+        position, reverse = cursor
+        data = json.dumps({'p': position, 'r': int(reverse)}, cls=DjangoJSONEncoder, separators=(',', ':'))
+        encoded = b64encode(data.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class PaymentsHistoryPagination(KeysetPagination):
+    ordering = ('-payment_date', '-pk')
+
+
+def _reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
@@ -0,0 +1,45 @@
+"""
+Full-text search over courses and lessons.
+
+On PostgreSQL titles and descriptions are indexed in the search_vector column generated by the database
+(migration 0014), other databases fall back to case-insensitive substring search without ranking by relevance.
+Substrings are matched by regular expressions, LIKE of SQLite ignores case of ASCII letters only.
+"""
+import re
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVectorField
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Substr
+
+SEARCH_CONFIG = 'russian'
+HEADLINE_OPTIONS = {'start_sel': '<b>', 'stop_sel': '</b>', 'max_words': 35, 'min_words': 15, 'max_fragments': 2}
+HEADLINE_LENGTH = 200
+
+def get_search_vector(model):
+    # the generated column is not a model field, Django must not write it
+    return RawSQL(f'"{model._meta.db_table}"."search_vector"', [], output_field=SearchVectorField())
+
+
+def search(queryset, text):
+    """
+    Materials matching the text with rank and highlighted headline of description, most relevant first.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return fallback_search(queryset, text)
+
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    vector = get_search_vector(queryset.model)
+    return queryset.alias(search=vector).filter(search=query).annotate(
+        rank=SearchRank(vector, query),
+        headline=SearchHeadline('description', query, config=SEARCH_CONFIG, **HEADLINE_OPTIONS),
+    ).order_by('-rank', 'pk')
+
+
+def fallback_search(queryset, text):
+    pattern = re.escape(text)
+    return queryset.filter(Q(title__iregex=pattern) | Q(description__iregex=pattern)).annotate(
+        rank=Case(When(title__iregex=pattern, then=Value(1.0)), default=Value(0.5), output_field=FloatField()),
+        headline=Substr('description', 1, HEADLINE_LENGTH),
+    ).order_by('-rank', 'pk')
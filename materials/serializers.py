@@ -1,10 +1,28 @@
 from rest_framework import serializers
 
-from materials.models import Course, Lesson, Payments, Subscription
+from materials.models import Course, Lesson, Payments, RevenueRollup, Subscription
+from materials.thumbnails import get_thumbnail_urls
 from materials.validators import UrlsValidator
 
 
+class ThumbnailsField(serializers.Field):
+    """
+    Thumbnail urls of an image field by size and format, null until they are made.
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        return get_thumbnail_urls(instance, self.image_field, self.context.get('request'))
+
+
 class LessonSerializer(serializers.ModelSerializer):
+    preview_thumbnails = ThumbnailsField('preview')
+
     class Meta:
         model = Lesson
         fields = '__all__'
@@ -13,29 +31,80 @@ class LessonSerializer(serializers.ModelSerializer):
         ]
 
 
+class InBulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Related field taking objects from a dict in serializer context, loaded by one in_bulk for all items.
+    """
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.context[self.context_key][int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class LessonBulkSerializer(LessonSerializer):
+    id = serializers.IntegerField(required=False)
+    course = InBulkPrimaryKeyRelatedField('courses', queryset=Course.objects.all(), required=False, allow_null=True)
+
+    class Meta(LessonSerializer.Meta):
+        read_only_fields = ('owner',)
+
+
 class CourseSerializer(serializers.ModelSerializer):
-    lessons_count = serializers.SerializerMethodField(read_only=True)
     lesson = LessonSerializer(read_only=True, many=True)
+    preview_thumbnails = ThumbnailsField('preview')
     is_subscribe = serializers.SerializerMethodField(read_only=True)
 
-    def get_lessons_count(self, instance):
-        return instance.lesson.count()
-
     def get_is_subscribe(self, instance):
+        if hasattr(instance, 'is_subscribe'):
+            return instance.is_subscribe
         user = self.context['request'].user
-        return Subscription.objects.filter(course=instance, user=user).exists()
+        return Subscription.objects.filter(course=instance, user_id=user.pk).exists()
 
     class Meta:
         model = Course
         fields = '__all__'
 
 
+class CourseSearchSerializer(serializers.ModelSerializer):
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Course
+        fields = ('id', 'title', 'rank', 'headline')
+
+
+class LessonSearchSerializer(serializers.ModelSerializer):
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Lesson
+        fields = ('id', 'title', 'course', 'rank', 'headline')
+
+
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payments
         fields = '__all__'
 
 
+class RevenueRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RevenueRollup
+        fields = '__all__'
+
+
 class SubscriptionSerializer(serializers.ModelSerializer):
 
     class Meta:
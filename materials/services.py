@@ -1,41 +1,380 @@
-import os
+import asyncio
+import logging
+from uuid import uuid4
+from weakref import WeakKeyDictionary
 
+import httpx
 import stripe
 from django.conf import settings
-from django.core.mail import send_mail
-
-
-def stripe_payment_created(material_name, material_price, user):
-    stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
-
-    product = stripe.Product.create(
-        name=material_name,
-    )
-
-    price = stripe.Price.create(
-        unit_amount=material_price,
-        currency="usd",
-        product=product['id'],
-    )
-
-    session = stripe.checkout.Session.create(
-        success_url="https://example.com/success",
-        line_items=[
-            {
-                "price": price.id,
-                "quantity": 1,
-            },
-        ],
-        mode="payment",
-        client_reference_id=user,
-    )
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from materials.caching import invalidate_responses
+from materials.models import Course, Lesson, Payments, StripeEvent, StripeProduct, Subscription
+from monitoring.metrics import track_external
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+STRIPE_RETRY_STATUSES = (409, 429, 500, 502, 503, 504)
+STRIPE_PAYMENT_EVENTS = ('checkout.session.completed', 'checkout.session.async_payment_succeeded')
+STRIPE_RESOURCES = {'products': stripe.Product, 'prices': stripe.Price}
+
+# conflict target is the expressions of materials_revenue_unique
+REVENUE_ROLLUP_UPSERT = """
+    INSERT INTO materials_revenuerollup AS rollup
+        (date, paid_course_id, paid_lesson_id, payment_method, amount, payments_count)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON CONFLICT (date, COALESCE(paid_course_id, 0), COALESCE(paid_lesson_id, 0), payment_method) DO UPDATE
+    SET amount = rollup.amount + EXCLUDED.amount, payments_count = rollup.payments_count + EXCLUDED.payments_count
+"""
+
+# shared keep-alive stripe client and concurrency limit for each running event loop
+_stripe_clients = WeakKeyDictionary()
+
+
+def get_material_field(material):
+    return 'course' if isinstance(material, Course) else 'lesson'
+
+
+def update_stripe_product(material, stripe_product):
+    """
+    Create stripe product and price of the course or lesson or update them when they are out of date.
+
+    Generator of stripe requests (resource, object id or None to create an object, params), the caller makes
+    them and sends the responses back. Returns the stripe product to save, None when it is up to date.
+    """
+    if stripe_product is None:
+        product = yield 'products', None, {'name': material.title}
+        stripe_product = StripeProduct(**{get_material_field(material): material}, product_id=product['id'],
+                                       title=material.title)
+    elif stripe_product.title == material.title and stripe_product.price == material.price:
+        return None
+    elif stripe_product.title != material.title:
+        yield 'products', stripe_product.product_id, {'name': material.title}
+        stripe_product.title = material.title
+
+    if stripe_product.price != material.price:
+        # stripe prices are immutable, new price is created for the same product
+        price = yield 'prices', None, {
+            'unit_amount': material.price,
+            'currency': 'usd',
+            'product': stripe_product.product_id,
+        }
+        stripe_product.price_id = price['id']
+        stripe_product.price = material.price
+
+    return stripe_product
+
+
+def get_stripe_price(material):
+    """
+    Return stripe price id for course or lesson, create stripe product and price only when
+    they are missing or out of date.
+    """
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    stripe.api_base = settings.STRIPE_API_BASE
+    stripe.max_network_retries = settings.STRIPE_MAX_RETRIES
+
+    material_field = get_material_field(material)
+    stripe_product = StripeProduct.objects.filter(**{material_field: material}).first()
+
+    requests, response = update_stripe_product(material, stripe_product), None
+    try:
+        while True:
+            resource, object_id, params = requests.send(response)
+            with track_external('stripe'):
+                api = STRIPE_RESOURCES[resource]
+                response = api.modify(object_id, **params) if object_id else api.create(**params)
+    except StopIteration as result:
+        updated_product = result.value
+
+    if updated_product is None:
+        return stripe_product.price_id
+    if updated_product.pk is None:
+        try:
+            with transaction.atomic():
+                updated_product.save()
+        except IntegrityError:
+            # concurrent purchase has already stored the product
+            return StripeProduct.objects.get(**{material_field: material}).price_id
+    else:
+        updated_product.save()
+
+    return updated_product.price_id
+
+
+def get_stripe_metadata(material):
+    # webhook events bring metadata back to link the payment with the material
+    return {get_material_field(material): material.pk}
+
+
+def stripe_payment_created(material, user):
+    price_id = get_stripe_price(material)
+
+    with track_external('stripe'):
+        session = stripe.checkout.Session.create(
+            success_url="https://example.com/success",
+            line_items=[
+                {
+                    "price": price_id,
+                    "quantity": 1,
+                },
+            ],
+            mode="payment",
+            client_reference_id=user,
+            metadata=get_stripe_metadata(material),
+        )
     return session
 
 
+def get_stripe_client():
+    """
+    Return httpx client and semaphore shared by all requests of the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client, semaphore = _stripe_clients.get(loop, (None, None))
+
+    if client is None or client.base_url != settings.STRIPE_API_BASE:
+        client = httpx.AsyncClient(
+            base_url=settings.STRIPE_API_BASE,
+            headers={'Authorization': f'Bearer {settings.STRIPE_SECRET_KEY}'},
+            timeout=httpx.Timeout(settings.STRIPE_TIMEOUT, connect=settings.STRIPE_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.STRIPE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.STRIPE_MAX_CONNECTIONS,
+            ),
+        )
+        semaphore = asyncio.Semaphore(settings.STRIPE_MAX_CONNECTIONS)
+        _stripe_clients[loop] = client, semaphore
+
+    return client, semaphore
+
+
+async def stripe_request(path, data):
+    """
+    POST to stripe API with retries and exponential backoff, the idempotency key makes retries safe.
+    """
+    client, semaphore = get_stripe_client()
+    headers = {'Idempotency-Key': str(uuid4())}
+
+    for attempt in range(settings.STRIPE_MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(settings.STRIPE_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+        try:
+            async with semaphore:
+                with track_external('stripe'):
+                    response = await client.post(path, data=data, headers=headers)
+        except httpx.TransportError:
+            if attempt == settings.STRIPE_MAX_RETRIES:
+                raise
+            continue
+
+        if response.status_code in STRIPE_RETRY_STATUSES and attempt < settings.STRIPE_MAX_RETRIES:
+            continue
+
+        response.raise_for_status()
+        return response.json()
+
+
+async def aget_stripe_price(material):
+    """
+    Async get_stripe_price, stripe requests are made by the shared async client instead of a thread.
+    """
+    material_field = get_material_field(material)
+    stripe_product = await StripeProduct.objects.filter(**{material_field: material}).afirst()
+
+    requests, response = update_stripe_product(material, stripe_product), None
+    try:
+        while True:
+            resource, object_id, params = requests.send(response)
+            response = await stripe_request(f'/v1/{resource}/{object_id}' if object_id else f'/v1/{resource}', params)
+    except StopIteration as result:
+        updated_product = result.value
+
+    if updated_product is None:
+        return stripe_product.price_id
+    if updated_product.pk is None:
+        try:
+            await updated_product.asave()
+        except IntegrityError:
+            # concurrent purchase has already stored the product
+            return (await StripeProduct.objects.aget(**{material_field: material})).price_id
+    else:
+        await updated_product.asave()
+
+    return updated_product.price_id
+
+
+async def astripe_payment_created(material, user):
+    price_id = await aget_stripe_price(material)
+
+    session = await stripe_request('/v1/checkout/sessions', {
+        'success_url': 'https://example.com/success',
+        'line_items[0][price]': price_id,
+        'line_items[0][quantity]': 1,
+        'mode': 'payment',
+        'client_reference_id': user,
+        **{f'metadata[{key}]': value for key, value in get_stripe_metadata(material).items()},
+    })
+    return session
+
+
+def get_subscribers_emails(course_pk, chunk_size):
+    """
+    Yield course subscribers emails in chunks, paginated by subscription pk (keyset).
+    """
+    last_pk = 0
+    while True:
+        chunk = list(
+            Subscription.objects.filter(course_id=course_pk, user__isnull=False, pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'user__email')[:chunk_size]
+        )
+        if not chunk:
+            return
+
+        last_pk = chunk[-1][0]
+        yield [email for _, email in chunk]
+
+
 def send_email(course, users):
-    send_mail(
-        subject=f'Курс {course} обновлен',
-        message='Произошло обновление курса, зайдите и посмотрите!',
-        from_email=settings.EMAIL_HOST_USER,
-        recipient_list=[users],
-    )
+    connection = get_connection()
+    messages = [
+        EmailMessage(
+            subject=f'Курс {course} обновлен',
+            body='Произошло обновление курса, зайдите и посмотрите!',
+            from_email=settings.EMAIL_HOST_USER,
+            to=[email],
+            connection=connection,
+        )
+        for email in users
+    ]
+    # one SMTP connection for the whole chunk
+    with track_external('smtp'):
+        connection.send_messages(messages)
+
+
+def update_revenue_rollups(batch_size):
+    """
+    Add payments not counted yet to daily revenue rollups, return number of processed payments.
+    """
+    processed = 0
+
+    while True:
+        with transaction.atomic():
+            # payments are marked instead of remembering the last pk, a payment committed after
+            # a payment with a greater pk is counted by the next run; concurrent tasks take different batches
+            payments_pks = list(
+                Payments.objects.select_for_update(skip_locked=True).filter(rolled_up_at__isnull=True)
+                .order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not payments_pks:
+                return processed
+
+            groups = Payments.objects.filter(pk__in=payments_pks).values(
+                'payment_date', 'paid_course', 'paid_lesson', 'payment_method'
+            ).annotate(
+                total=Sum('amount'), count=Count('pk')
+            ).order_by()
+
+            # concurrent tasks may add to the same rollup, the sums are added by the database
+            with connection.cursor() as cursor:
+                cursor.executemany(REVENUE_ROLLUP_UPSERT, [
+                    (group['payment_date'], group['paid_course'], group['paid_lesson'], group['payment_method'],
+                     group['total'], group['count'])
+                    for group in groups
+                ])
+
+            Payments.objects.filter(pk__in=payments_pks).update(rolled_up_at=timezone.now())
+            processed += len(payments_pks)
+
+
+def recount_courses(batch_size):
+    """
+    Correct lessons and subscribers counters of courses drifted from the actual numbers, return number of
+    corrected courses.
+    """
+    corrected, last_pk = 0, 0
+    # short statements in pk ranges instead of locking all courses at once
+    while pks := list(Course.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]):
+        corrected += Course.objects.filter(pk__in=pks).recount()
+        last_pk = pks[-1]
+
+    if corrected:
+        invalidate_responses('course')
+    return corrected
+
+
+def parse_pk(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_paid_session(event):
+    """
+    (session id, amount, user pk, course pk, lesson pk) of a paid checkout session of the event,
+    None for other events and sessions without id or amount.
+    """
+    if event.type not in STRIPE_PAYMENT_EVENTS:
+        return None
+
+    data = event.payload.get('data') if isinstance(event.payload, dict) else None
+    session = data.get('object') if isinstance(data, dict) else None
+    if not isinstance(session, dict) or session.get('payment_status') != 'paid':
+        return None
+
+    session_id, amount = session.get('id'), parse_pk(session.get('amount_total'))
+    if not isinstance(session_id, str) or amount is None or amount < 0:
+        logger.warning('Stripe event %s without checkout session id or amount is skipped', event.event_id)
+        return None
+
+    metadata = session.get('metadata')
+    metadata = metadata if isinstance(metadata, dict) else {}
+    return (session_id, amount, parse_pk(session.get('client_reference_id')), parse_pk(metadata.get('course')),
+            parse_pk(metadata.get('lesson')))
+
+
+def create_stripe_payments(batch_size):
+    """
+    Create payments of paid checkout sessions from stored stripe events in batches,
+    return number of processed events.
+    """
+    processed = 0
+
+    while True:
+        with transaction.atomic():
+            # concurrent tasks take different batches
+            events = list(
+                StripeEvent.objects.select_for_update(skip_locked=True)
+                .filter(processed_at__isnull=True).order_by('pk')[:batch_size]
+            )
+            if not events:
+                return processed
+
+            # malformed events are processed without payments, otherwise every run would fail on them again
+            sessions = [session for session in map(get_paid_session, events) if session is not None]
+            users = User.objects.in_bulk([user for _, _, user, _, _ in sessions])
+            courses = Course.objects.in_bulk([course for _, _, _, course, _ in sessions])
+            lessons = Lesson.objects.in_bulk([lesson for _, _, _, _, lesson in sessions])
+
+            payments = []
+            for session_id, amount, user, course, lesson in sessions:
+                user, course, lesson = users.get(user), courses.get(course), lessons.get(lesson)
+                # sessions of deleted users or materials have nothing to link the payment with
+                if user is None or course is None and lesson is None:
+                    continue
+                payments.append(Payments(
+                    user=user, paid_course=course, paid_lesson=lesson, amount=amount,
+                    payment_method='перевод на счет', stripe_session_id=session_id,
+                ))
+
+            # session id is unique, sessions reported by several events or retries are counted once
+            Payments.objects.bulk_create(payments, ignore_conflicts=True)
+            StripeEvent.objects.filter(pk__in=[event.pk for event in events]).update(processed_at=timezone.now())
+            processed += len(events)
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from materials.caching import course_cache, invalidate_responses
+from materials.models import Course, Lesson, Subscription
+from materials.tasks import create_thumbnails
+from materials.thumbnails import is_stale
+
+
+def schedule_thumbnails(instance, field_name):
+    """
+    Make thumbnails by Celery after commit when the image has been uploaded or replaced.
+    """
+    if is_stale(instance, field_name):
+        transaction.on_commit(lambda: create_thumbnails.delay(instance._meta.label, instance.pk, field_name))
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    invalidate_responses('course')
+    course_cache.invalidate(f'course:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def lesson_changed(sender, instance, **kwargs):
+    # courses responses contain nested lessons and their count
+    invalidate_responses('lesson', 'course')
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+def preview_saved(sender, instance, **kwargs):
+    schedule_thumbnails(instance, 'preview')
+
+
+@receiver([post_save, post_delete], sender=Subscription)
+def subscription_changed(sender, instance, **kwargs):
+    # number of subscribers in courses responses of other users is updated when they expire, with every
+    # subscription they would be hardly ever cached
+    invalidate_responses(f'subscription:{instance.user_id}')
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Subscription)
+def counted_saved(sender, instance, created, **kwargs):
+    loaded_course_id = None if created else getattr(instance, '_loaded_course_id', instance.course_id)
+    if instance.course_id != loaded_course_id:
+        Course.objects.add_to_counter(sender.course_counter, {instance.course_id: 1, loaded_course_id: -1})
+    instance._loaded_course_id = instance.course_id
+
+
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Subscription)
+def counted_deleted(sender, instance, origin=None, **kwargs):
+    # counters of deleted courses don't matter
+    if getattr(origin, 'model', type(origin)) is not Course:
+        Course.objects.add_to_counter(sender.course_counter, {instance.course_id: -1})
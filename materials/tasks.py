@@ -1,9 +1,13 @@
 from datetime import timedelta
 
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
 
-from materials.services import send_email
+from materials.services import send_email, get_subscribers_emails, update_revenue_rollups, create_stripe_payments, \
+    recount_courses
+from materials.thumbnails import make_thumbnails
+from users.authentication import forget_users
 from users.models import User
 
 
@@ -12,12 +16,48 @@ def subscription_send_mail(course, users):
     send_email(course, users)
 
 
+@shared_task
+def course_update_fan_out(course_pk, course_name):
+    for emails in get_subscribers_emails(course_pk, settings.SUBSCRIPTION_MAIL_CHUNK_SIZE):
+        subscription_send_mail.delay(course_name, emails)
+
+
 @shared_task
 def check_last_session():
+    """
+    Deactivate users who haven't logged in for four months, return number of deactivated users.
+    """
     current_date = timezone.now()
     four_months_ago = current_date - timedelta(days=120)
 
-    for user in User.objects.all():
-        if user.last_login < four_months_ago:
-            user.is_active = False
-            user.save()
+    inactive_users = User.objects.filter(is_active=True, last_login__lt=four_months_ago)
+    deactivated = 0
+
+    # update in batches to keep each statement's row locks short
+    while True:
+        batch = list(inactive_users.values_list('pk', flat=True)[:settings.INACTIVE_USERS_BATCH_SIZE])
+        if not batch:
+            return deactivated
+        deactivated += inactive_users.filter(pk__in=batch).update(is_active=False)
+        # tokens of deactivated users stop working without waiting for cached users to expire
+        forget_users(*batch)
+
+
+@shared_task
+def revenue_rollup():
+    return update_revenue_rollups(settings.REVENUE_ROLLUP_BATCH_SIZE)
+
+
+@shared_task
+def reconcile_course_counters():
+    return recount_courses(settings.COURSE_COUNTERS_BATCH_SIZE)
+
+
+@shared_task
+def process_stripe_events():
+    return create_stripe_payments(settings.STRIPE_EVENTS_BATCH_SIZE)
+
+
+@shared_task
+def create_thumbnails(model_label, pk, field_name):
+    return make_thumbnails(model_label, pk, field_name)
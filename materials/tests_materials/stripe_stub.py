@@ -0,0 +1,95 @@
+"""
+Local stand-in for the Stripe API, used by tests and benchmarks instead of the network.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from urllib.parse import parse_qs
+
+
+class StripeStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        params = parse_qs(self.rfile.read(length).decode())
+        path = self.path.split('?')[0]
+
+        if server.delay:
+            time.sleep(server.delay)
+
+        with server.lock:
+            server.calls[path] += 1
+            object_id = next(server.ids)
+
+        if path == '/v1/products':
+            body = {'id': f'prod_{object_id}', 'object': 'product', 'name': params.get('name', [''])[0]}
+        elif path.startswith('/v1/products/'):
+            body = {'id': path.rsplit('/', 1)[-1], 'object': 'product', 'name': params.get('name', [''])[0]}
+        elif path == '/v1/prices':
+            body = {'id': f'price_{object_id}', 'object': 'price', 'product': params.get('product', [''])[0],
+                    'unit_amount': int(params.get('unit_amount', ['0'])[0])}
+        elif path == '/v1/checkout/sessions':
+            body = {'id': f'cs_{object_id}', 'object': 'checkout.session',
+                    'url': f'https://checkout.stripe.com/c/pay/cs_{object_id}',
+                    'client_reference_id': params.get('client_reference_id', [None])[0]}
+        else:
+            self.send_json(404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown path'}})
+            return
+
+        self.send_json(200, body)
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StripeStub:
+    """
+    Stripe API stub running in a background thread.
+
+    `calls` counts requests by path, `delay` emulates slow Stripe responses.
+    """
+
+    def __init__(self, delay=0):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StripeStubHandler)
+        self.server.daemon_threads = True
+        self.server.delay = delay
+        self.server.lock = threading.Lock()
+        self.server.calls = Counter()
+        self.server.ids = count(1)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    @property
+    def calls(self):
+        return self.server.calls
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
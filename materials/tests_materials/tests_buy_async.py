@@ -0,0 +1,163 @@
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from materials.models import Course, Lesson, StripeProduct
+from materials.tests_materials.stripe_stub import StripeStub
+from users.models import User
+
+
+class BuyAsyncTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stripe = StripeStub().start()
+        cls.settings_override = override_settings(STRIPE_SECRET_KEY='sk_test_stub', STRIPE_API_BASE=cls.stripe.url,
+                                                  STRIPE_RETRY_BACKOFF=0)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.stripe.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.client = AsyncClient()
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+        self.course = Course.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+
+        self.lesson = Lesson.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+
+        self.stripe.calls.clear()
+
+    async def test_course_buy(self):
+        """
+        Test async course purchase, warm purchase creates only stripe session.
+        """
+
+        for _ in range(2):
+            response = await self.client.post(
+                reverse('materials:course-buy-async', kwargs={'pk': self.course.pk}),
+                headers=self.headers
+            )
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_200_OK
+            )
+
+        self.assertTrue(
+            response.json()['Payment url'].startswith('https://checkout.stripe.com/')
+        )
+
+        self.assertEqual(
+            dict(self.stripe.calls),
+            {'/v1/products': 1, '/v1/prices': 1, '/v1/checkout/sessions': 2}
+        )
+
+    async def test_changed_course_buy(self):
+        """
+        Test async purchase after course title and price changed updates stripe product and creates a price.
+        """
+
+        url = reverse('materials:course-buy-async', kwargs={'pk': self.course.pk})
+        await self.client.post(url, headers=self.headers)
+        await Course.objects.filter(pk=self.course.pk).aupdate(title='new', price=200)
+        response = await self.client.post(url, headers=self.headers)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        stripe_product = await StripeProduct.objects.aget()
+
+        self.assertEqual(
+            (stripe_product.title, stripe_product.price),
+            ('new', 200)
+        )
+
+        self.assertEqual(
+            dict(self.stripe.calls),
+            {'/v1/products': 1, f'/v1/products/{stripe_product.product_id}': 1, '/v1/prices': 2,
+             '/v1/checkout/sessions': 2}
+        )
+
+    async def test_lesson_buy(self):
+        """
+        Test async lesson purchase.
+        """
+
+        response = await self.client.post(
+            reverse('materials:lesson-buy-async', kwargs={'pk': self.lesson.pk}),
+            headers=self.headers
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+    async def test_invalid_lesson_buy(self):
+        """
+        Test async purchase of missing lesson.
+        """
+
+        response = await self.client.post(
+            reverse('materials:lesson-buy-async', kwargs={'pk': 999}),
+            headers=self.headers
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+
+    async def test_unauthenticated_buy(self):
+        """
+        Test async purchase without token.
+        """
+
+        response = await self.client.post(
+            reverse('materials:course-buy-async', kwargs={'pk': self.course.pk})
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    async def test_stripe_unavailable(self):
+        """
+        Test async purchase when stripe doesn't respond after retries.
+        """
+
+        with override_settings(STRIPE_API_BASE='http://127.0.0.1:1', STRIPE_MAX_RETRIES=0):
+            response = await self.client.post(
+                reverse('materials:course-buy-async', kwargs={'pk': self.course.pk}),
+                headers=self.headers
+            )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_502_BAD_GATEWAY
+        )
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from materials.tasks import check_last_session
+from users.models import User
+
+
+@override_settings(INACTIVE_USERS_BATCH_SIZE=2)
+class CheckLastSessionTestCase(TestCase):
+
+    def setUp(self):
+        now = timezone.now()
+
+        User.objects.bulk_create(
+            User(email=f'old{i}@test.ru', password='test', last_login=now - timedelta(days=200))
+            for i in range(5)
+        )
+        User.objects.create(email='recent@test.ru', password='test', last_login=now - timedelta(days=1))
+        User.objects.create(email='never@test.ru', password='test', last_login=None)
+
+    def test_check_last_session(self):
+        """
+        Test deactivating users who haven't logged in for four months.
+        """
+
+        self.assertEqual(
+            check_last_session(),
+            5
+        )
+
+        self.assertEqual(
+            set(User.objects.filter(is_active=True).values_list('email', flat=True)),
+            {'recent@test.ru', 'never@test.ru'}
+        )
+
+        self.assertEqual(
+            check_last_session(),
+            0
+        )
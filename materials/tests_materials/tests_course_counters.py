@@ -0,0 +1,147 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+
+from materials.models import Course, Lesson, Subscription
+from materials.services import recount_courses
+from users.models import User
+
+
+class CourseCountersTestCase(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='admin@test.ru',
+            password='test',
+            is_staff=True,
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.course = Course.objects.create(title='first', description='test', owner=self.user)
+        self.other_course = Course.objects.create(title='second', description='test', owner=self.user)
+
+    def get_counters(self, course):
+        course.refresh_from_db()
+        return course.lessons_count, course.subscribers_count
+
+    def test_lessons(self):
+        """
+        Test lessons counted when created, moved to another course and deleted.
+        """
+
+        response = self.client.post(
+            reverse('materials:lesson-create'),
+            {'title': 'test', 'description': 'test', 'course': self.course.pk}
+        )
+        lesson_pk = response.json()['id']
+
+        self.assertEqual(
+            self.client.get(reverse('materials:course-detail', kwargs={'pk': self.course.pk})).json()['lessons_count'],
+            1
+        )
+
+        self.client.patch(reverse('materials:lesson-update', kwargs={'pk': lesson_pk}),
+                          {'course': self.other_course.pk})
+
+        self.assertEqual(
+            [self.get_counters(self.course), self.get_counters(self.other_course)],
+            [(0, 0), (1, 0)]
+        )
+
+        self.client.delete(reverse('materials:lesson-delete', kwargs={'pk': lesson_pk}))
+
+        self.assertEqual(
+            self.get_counters(self.other_course),
+            (0, 0)
+        )
+
+    def test_bulk(self):
+        """
+        Test lessons counted when created and moved by bulk queries.
+        """
+
+        response = self.client.post(
+            reverse('materials:lesson-bulk'),
+            [{'title': f'test{i}', 'description': 'test', 'course': self.course.pk} for i in range(3)],
+            format='json'
+        )
+        lessons = response.json()
+
+        self.client.post(
+            reverse('materials:lesson-bulk'),
+            [{'id': lessons[0]['lesson']['id'], 'course': self.other_course.pk}],
+            format='json'
+        )
+
+        self.assertEqual(
+            [self.get_counters(self.course), self.get_counters(self.other_course)],
+            [(2, 0), (1, 0)]
+        )
+
+        Subscription.objects.bulk_create([Subscription(user=self.user, course=self.course)])
+        Subscription.objects.bulk_create([Subscription(user=self.user, course=self.course)], ignore_conflicts=True)
+
+        self.assertEqual(
+            self.get_counters(self.course),
+            (2, 1)
+        )
+
+    def test_subscribers(self):
+        """
+        Test subscribers counted by subscribe and unsubscribe.
+        """
+
+        url = reverse('materials:course-detail', kwargs={'pk': self.course.pk})
+        member = User.objects.create(email='member@test.ru', password='test', role='member', is_active=True)
+        self.client.force_authenticate(user=member)
+        self.client.post(reverse('materials:course-subscribe', kwargs={'pk': self.course.pk}))
+        self.client.post(reverse('materials:course-subscribe', kwargs={'pk': self.course.pk}))
+        self.client.force_authenticate(user=self.user)
+
+        self.assertEqual(
+            self.client.get(url).json()['subscribers_count'],
+            1
+        )
+
+        member.delete()
+
+        self.assertEqual(
+            self.get_counters(self.course),
+            (0, 0)
+        )
+
+    def test_popularity(self):
+        """
+        Test course list ordered by number of subscribers.
+        """
+
+        users = User.objects.bulk_create(User(email=f'user{i}@test.ru') for i in range(2))
+        Subscription.objects.bulk_create(Subscription(user=user, course=self.other_course) for user in users)
+
+        response = self.client.get(reverse('materials:course-list'), {'ordering': '-subscribers_count'})
+
+        self.assertEqual(
+            [(course['title'], course['subscribers_count']) for course in response.json()['results']],
+            [('second', 2), ('first', 0)]
+        )
+
+    def test_recount(self):
+        """
+        Test drifted counters corrected.
+        """
+
+        Lesson.objects.create(title='test', description='test', course=self.course)
+        Course.objects.filter(pk=self.other_course.pk).update(lessons_count=5, subscribers_count=3)
+        Lesson.objects.filter(course=self.course).update(course=None)
+
+        self.assertEqual(
+            recount_courses(batch_size=1),
+            2
+        )
+
+        self.assertEqual(
+            [self.get_counters(self.course), self.get_counters(self.other_course)],
+            [(0, 0), (0, 0)]
+        )
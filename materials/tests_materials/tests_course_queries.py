@@ -0,0 +1,93 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from materials.models import Course, Lesson, Subscription
+from users.models import User
+
+
+class CourseListQueriesTestCase(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        courses = Course.objects.bulk_create(
+            Course(title=f'test{i}', description='test', owner=self.user) for i in range(50)
+        )
+        Lesson.objects.bulk_create(
+            Lesson(title=f'test{i}', description='test', course=course, owner=self.user)
+            for course in courses for i in range(3)
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=self.user, course=course) for course in courses[::2]
+        )
+
+    def get_list_queries(self, page_size):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse('materials:course-list'),
+                {'page_size': page_size}
+            )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertEqual(
+            len(response.json()['results']),
+            page_size
+        )
+
+        return response, len(context)
+
+    def test_course_list_queries_are_flat(self):
+        """
+        Test that number of queries for course list doesn't depend on page size.
+        """
+
+        _, small_page_queries = self.get_list_queries(5)
+        _, big_page_queries = self.get_list_queries(50)
+
+        self.assertEqual(
+            small_page_queries,
+            big_page_queries
+        )
+
+        self.assertLessEqual(
+            big_page_queries,
+            3
+        )
+
+    def test_course_list_annotated_fields(self):
+        """
+        Test annotated lessons count and subscription flag in course list.
+        """
+
+        response, _ = self.get_list_queries(4)
+        results = response.json()['results']
+
+        self.assertEqual(
+            [course['lessons_count'] for course in results],
+            [3, 3, 3, 3]
+        )
+
+        self.assertEqual(
+            [course['is_subscribe'] for course in results],
+            [True, False, True, False]
+        )
+
+        self.assertEqual(
+            len(results[0]['lesson']),
+            3
+        )
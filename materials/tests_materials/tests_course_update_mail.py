@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.core import mail
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from config.celery import app
+from materials.models import Course, Subscription
+from users.models import User
+
+
+@override_settings(SUBSCRIPTION_MAIL_CHUNK_SIZE=2)
+class CourseUpdateMailTestCase(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='admin@test.ru',
+            password='test',
+
+            is_staff=True,
+            is_active=True,
+            is_superuser=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.course = Course.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+
+        app.conf.task_always_eager = True
+
+    def tearDown(self):
+        app.conf.task_always_eager = False
+        super().tearDown()
+
+    def update_course(self):
+        return self.client.patch(
+            reverse('materials:course-detail', kwargs={'pk': self.course.pk}),
+            data={'title': 'updated'}
+        )
+
+    def test_update_without_subscribers(self):
+        """
+        Test course update without subscribers doesn't send emails.
+        """
+
+        response = self.update_course()
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertEqual(
+            len(mail.outbox),
+            0
+        )
+
+    def test_update_notifies_all_subscribers(self):
+        """
+        Test course update notifies every subscriber, one task and one connection per chunk.
+        """
+
+        users = User.objects.bulk_create(
+            User(email=f'member{i}@test.ru', password='test') for i in range(5)
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=user, course=self.course) for user in users
+        )
+
+        with mock.patch('materials.services.get_connection', wraps=mail.get_connection) as get_connection:
+            response = self.update_course()
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            sorted(user.email for user in users)
+        )
+
+        self.assertEqual(
+            mail.outbox[0].subject,
+            'Курс updated обновлен'
+        )
+
+        self.assertEqual(
+            get_connection.call_count,
+            3
+        )
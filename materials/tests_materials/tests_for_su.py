@@ -52,7 +52,7 @@ class SULessonTestCase(APITestCase):
 
         self.assertEqual(
             response.json(),
-            {'count': 1, 'next': None, 'previous': None, 'results': [
+            {'next': None, 'previous': None, 'results': [
                 {'id': 1, 'title': 'test', 'description': 'test', 'preview': None, 'video_url': None, 'course': None,
                  'owner': None}]}
         )
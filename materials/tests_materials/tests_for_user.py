@@ -66,7 +66,7 @@ class MemberLessonTestCase(APITestCase):
 
         self.assertEqual(
             response.json(),
-            {'count': 2, 'next': None, 'previous': None, 'results': [
+            {'next': None, 'previous': None, 'results': [
                 {'id': 1, 'title': 'test', 'description': 'test', 'preview': None, 'video_url': None, 'course': None,
                  'owner': 1},
                 {'id': 2, 'title': 'test2', 'description': 'test2', 'preview': None, 'video_url': None, 'course': None,
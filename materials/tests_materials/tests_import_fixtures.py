@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+from datetime import date
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from materials.models import Course, ImportCheckpoint, Lesson, Payments
+from users.models import User
+
+FIXTURE = [
+    {'model': 'materials.course', 'pk': 10, 'fields': {'title': 'Курс', 'description': 'test'}},
+    {'model': 'materials.lesson', 'pk': 20, 'fields': {
+        'title': 'Урок', 'description': 'test', 'course': 10,
+        'video_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+    }},
+    {'model': 'materials.lesson', 'pk': 21, 'fields': {'title': 'test', 'description': 'test', 'course': 999}},
+    {'model': 'materials.payments', 'pk': 30, 'fields': {
+        'user': ['buyer@test.ru'], 'payment_date': '2023-10-08', 'paid_lesson': 20, 'amount': 10500,
+        'payment_method': 'наличные',
+    }},
+]
+
+
+class ImportFixturesTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.user = User.objects.create(email='buyer@test.ru', password='test', is_active=True)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    @patch('materials.imports.READ_SIZE', 16)
+    def test_json(self):
+        """
+        Test import of a JSON array read in parts smaller than a record.
+        """
+
+        path = self.write('dump.json', json.dumps(FIXTURE, ensure_ascii=False, indent=2))
+        stdout = StringIO()
+        call_command('import_fixtures', path, batch_size=2, stdout=stdout)
+
+        self.assertEqual(
+            list(Lesson.objects.values_list('pk', 'course__title', 'video_id')),
+            [(20, 'Курс', 'dQw4w9WgXcQ')]
+        )
+
+        self.assertEqual(
+            list(Payments.objects.values_list('pk', 'user', 'paid_lesson', 'payment_date')),
+            [(30, self.user.pk, 20, date(2023, 10, 8))]
+        )
+
+        self.assertEqual(
+            Course.objects.get(pk=10).lessons_count,
+            1
+        )
+
+        self.assertIn(
+            'done: 3 imported, 1 skipped',
+            stdout.getvalue()
+        )
+
+        # parts of the file end in the middle of Cyrillic letters, positions are in bytes
+        self.assertEqual(
+            ImportCheckpoint.objects.get(source=path).position,
+            os.path.getsize(path) - len(b'\n]')
+        )
+
+        # new objects get pks after imported ones
+        self.assertGreater(
+            Course.objects.create(title='test', description='test').pk,
+            10
+        )
+
+    def test_existing_rows(self):
+        """
+        Test import of records with pks of existing rows stops with an error naming the checkpoint.
+        """
+
+        path = self.write('dump.ndjson', ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in FIXTURE))
+        call_command('import_fixtures', path, batch_size=2, stdout=StringIO())
+
+        with self.assertRaisesMessage(CommandError, f'Records of {path} after the checkpoint at 0 records (byte 0)'):
+            call_command('import_fixtures', path, restart=True, batch_size=2, stdout=StringIO())
+
+    def test_ndjson_records(self):
+        """
+        Test import of plain records of one model from NDJSON with new pks by INSERT.
+        """
+
+        course = Course.objects.create(title='test', description='test')
+        path = self.write('lessons.ndjson', ''.join(
+            json.dumps({'id': 1, 'title': f'Урок {i}', 'description': 'test', 'course': course.pk}) + '\n'
+            for i in range(5)
+        ))
+        call_command('import_fixtures', path, model='materials.lesson', new_pks=True, no_copy=True, batch_size=2,
+                     stdout=StringIO())
+
+        self.assertEqual(
+            list(Lesson.objects.filter(course=course).order_by('pk').values_list('title', flat=True)),
+            [f'Урок {i}' for i in range(5)]
+        )
+
+        self.assertEqual(
+            ImportCheckpoint.objects.get(source=path).records,
+            5
+        )
+
+    def test_resume(self):
+        """
+        Test import continues after the last imported batch when the file is fixed.
+        """
+
+        lines = [json.dumps(record, ensure_ascii=False) + '\n' for record in FIXTURE]
+        path = self.write('dump.ndjson', ''.join(lines[:2]) + '{"model": broken\n' + ''.join(lines[2:]))
+
+        with self.assertRaises(CommandError):
+            call_command('import_fixtures', path, batch_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            (Course.objects.count(), Lesson.objects.count()),
+            (1, 1)
+        )
+
+        self.write('dump.ndjson', ''.join(lines[:2]) + '\n' + ''.join(lines[2:]))
+        stdout = StringIO()
+        call_command('import_fixtures', path, batch_size=1, stdout=stdout)
+
+        self.assertIn(
+            'resuming after 2 records',
+            stdout.getvalue()
+        )
+
+        self.assertEqual(
+            (Course.objects.count(), Lesson.objects.count(), Payments.objects.count()),
+            (1, 1, 1)
+        )
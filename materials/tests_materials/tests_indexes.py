@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from materials.models import Course, Lesson, Payments, Subscription
+from materials.search import search
+from users.models import User
+
+
+class HotQueriesIndexTestCase(TestCase):
+    """
+    EXPLAIN hot queries with sequential scans disabled, plan keeps Seq Scan only if no index fits the query.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            User(email=f'member{i}@test.ru', password='test', last_login=timezone.now() - timedelta(days=i))
+            for i in range(50)
+        )
+        cls.courses = Course.objects.bulk_create(
+            Course(title=f'test{i}', description='test') for i in range(20)
+        )
+        cls.lessons = Lesson.objects.bulk_create(
+            Lesson(title=f'test{i}', description='test', course=cls.courses[i % 20], video_id=f'video{i % 10}')
+            for i in range(40)
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=user, course=course) for user in cls.users for course in cls.courses[:5]
+        )
+        Payments.objects.bulk_create(
+            Payments(user=cls.users[i % 50], paid_course=cls.courses[i % 20] if i % 2 else None,
+                     paid_lesson=None if i % 2 else cls.lessons[i % 40], amount=100,
+                     payment_method=Payments.PAYMENT_METHOD[i % 2][0])
+            for i in range(1000)
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan, msg=f'\n{queryset.query}\n{plan}')
+
+    def test_subscription_lookup(self):
+        """
+        Test is_subscribe and unsubscribe lookup by user and course.
+        """
+
+        self.assertUsesIndex(
+            Subscription.objects.filter(user=self.users[0], course=self.courses[0])
+        )
+
+    def test_payments_filters(self):
+        """
+        Test payments filtered by material or payment method and ordered by date.
+        """
+
+        self.assertUsesIndex(
+            Payments.objects.filter(paid_course=self.courses[1]).order_by('-payment_date')[:10]
+        )
+
+        self.assertUsesIndex(
+            Payments.objects.filter(paid_lesson=self.lessons[0]).order_by('-payment_date')[:10]
+        )
+
+        self.assertUsesIndex(
+            Payments.objects.filter(payment_method='наличные').order_by('-payment_date')[:10]
+        )
+
+    def test_payments_keyset_page(self):
+        """
+        Test payments page ordered by date and pk.
+        """
+
+        self.assertUsesIndex(
+            Payments.objects.filter(payment_date__lte=timezone.now().date()).order_by('-payment_date', '-pk')[:10]
+        )
+
+    def test_inactive_users(self):
+        """
+        Test inactive users lookup of check_last_session.
+        """
+
+        self.assertUsesIndex(
+            User.objects.filter(is_active=True, last_login__lt=timezone.now() - timedelta(days=120))
+        )
+
+    def test_lessons_by_video(self):
+        """
+        Test lessons lookup by YouTube video id.
+        """
+
+        self.assertUsesIndex(
+            Lesson.objects.filter(video_id='video1')
+        )
+
+    def test_search(self):
+        """
+        Test full-text search of lessons by the search vector.
+        """
+
+        self.assertUsesIndex(
+            search(Lesson.objects.all(), 'test')
+        )
@@ -0,0 +1,162 @@
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from materials.models import Course, Lesson
+from users.models import User
+
+VIDEO_URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+class LessonBulkTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.user2 = User.objects.create(
+            email='member2@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.course = Course.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+        self.lesson = Lesson.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+        self.lesson2 = Lesson.objects.create(
+            title='test2',
+            description='test2',
+            owner=self.user2
+        )
+
+    def test_bulk_create(self):
+        """
+        Test creating lessons of a curriculum with constant number of queries.
+        """
+
+        data = [
+            {'title': f'lesson {i}', 'description': 'test', 'video_url': VIDEO_URL, 'course': self.course.pk}
+            for i in range(50)
+        ]
+
+        # courses in_bulk, savepoint, insert, counter update, savepoint release
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('materials:lesson-bulk'), data, format='json')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertEqual(
+            self.course.lesson.filter(owner=self.user, video_id='dQw4w9WgXcQ').count(),
+            50
+        )
+
+        self.assertEqual(
+            response.json()[0]['lesson']['owner'],
+            self.user.pk
+        )
+
+    def test_bulk_partial_errors(self):
+        """
+        Test invalid lessons are answered with errors and valid ones are saved.
+        """
+
+        data = [
+            {'title': 'new', 'description': 'test'},
+            {'title': 'bad video', 'description': 'test', 'video_url': 'https://vimeo.com/1'},
+            {'title': 'no course', 'description': 'test', 'course': 100500},
+            {'id': self.lesson.pk, 'title': 'updated'},
+            {'id': self.lesson2.pk, 'title': 'not mine'},
+            {'id': self.lesson.pk, 'title': 'twice'},
+            {'description': 'no title'},
+            'lesson',
+        ]
+
+        response = self.client.post(reverse('materials:lesson-bulk'), data, format='json')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertEqual(
+            [list(result) for result in response.json()],
+            [['lesson'], ['errors'], ['errors'], ['lesson'], ['errors'], ['errors'], ['errors'], ['errors']]
+        )
+
+        self.assertEqual(
+            response.json()[1]['errors'],
+            {'non_field_errors': ['Видео может быть только с YouTube']}
+        )
+
+        self.assertEqual(
+            set(Lesson.objects.values_list('title', flat=True)),
+            {'new', 'updated', 'test2'}
+        )
+
+    def test_bulk_all_invalid(self):
+        """
+        Test bulk request without valid lessons.
+        """
+
+        response = self.client.post(reverse('materials:lesson-bulk'), [{'title': 'no description'}], format='json')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+        with override_settings(LESSON_BULK_MAX_SIZE=1):
+            response = self.client.post(reverse('materials:lesson-bulk'), [{}, {}], format='json')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_bulk_moderator(self):
+        """
+        Test moderator updates lessons of others but doesn't create lessons.
+        """
+
+        self.user2.role = 'moderator'
+        self.user2.save()
+        self.client.force_authenticate(user=self.user2)
+
+        response = self.client.post(
+            reverse('materials:lesson-bulk'),
+            [{'id': self.lesson.pk, 'price': 500}, {'title': 'new', 'description': 'test'}],
+            format='json'
+        )
+
+        self.assertEqual(
+            response.json()[1],
+            {'errors': {'non_field_errors': ['Модератор не может создавать уроки']}}
+        )
+
+        self.lesson.refresh_from_db()
+        self.assertEqual(
+            (self.lesson.price, self.lesson.owner),
+            (500, self.user)
+        )
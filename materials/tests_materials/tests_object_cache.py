@@ -0,0 +1,158 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from materials.caching import LocalCache, TieredCache, course_cache, get_cached_course
+from materials.models import Course
+from users.models import User
+
+
+class LocalCacheTestCase(TestCase):
+
+    def test_lru(self):
+        """
+        Test least recently used entries evicted over the limit.
+        """
+
+        local = LocalCache(max_entries=2, timeout=60)
+        local.set('a', 1, frozenset())
+        local.set('b', 2, frozenset())
+        local.get('a')
+        local.set('c', 3, frozenset())
+
+        self.assertEqual(
+            [local.get('a'), local.get('b'), local.get('c')],
+            [1, None, 3]
+        )
+
+    def test_expiry_and_tags(self):
+        """
+        Test entries expired by timeout and dropped by tags.
+        """
+
+        local = LocalCache(max_entries=10, timeout=60)
+        local.set('a', 1, frozenset({'x'}))
+        local.set('b', 2, frozenset({'y'}))
+        local.drop_tags(frozenset({'x'}))
+
+        self.assertEqual(
+            [local.get('a'), local.get('b')],
+            [None, 2]
+        )
+
+        with mock.patch('materials.caching.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(
+                local.get('b')
+            )
+
+
+@override_settings(OBJECT_CACHE_L1_TIMEOUT=60)
+class TieredCacheTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tiers(self):
+        """
+        Test values served by L1, by L2 in another process and loaded again after invalidation.
+        """
+
+        default = mock.Mock(return_value={'title': 'test'})
+        objects = TieredCache('test')
+
+        objects.get_or_set(1, default, tags=['test:1'])
+        objects.get_or_set(1, default, tags=['test:1'])
+
+        # another process has its own L1 and shares L2
+        TieredCache('test').get_or_set(1, default, tags=['test:1'])
+
+        self.assertEqual(
+            default.call_count,
+            1
+        )
+
+        self.assertEqual(
+            [REGISTRY.get_sample_value('cache_requests_total', {'cache': 'test', 'tier': tier, 'result': result})
+             for tier, result in [('l1', 'hit'), ('l1', 'miss'), ('l2', 'hit'), ('l2', 'miss')]],
+            [1, 2, 1, 1]
+        )
+
+        objects.invalidate('test:1')
+
+        self.assertEqual(
+            objects.get_or_set(1, default, tags=['test:1']),
+            {'title': 'test'}
+        )
+
+        self.assertEqual(
+            default.call_count,
+            2
+        )
+
+
+class CachedCourseTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        course_cache.local.clear()
+
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.course = Course.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+
+    def test_subscribe(self):
+        """
+        Test subscribe and unsubscribe take the course from the object cache.
+        """
+
+        self.client.post(reverse('materials:course-subscribe', kwargs={'pk': self.course.pk}))
+
+        # subscription lookup, delete and counter update, no course query
+        with self.assertNumQueries(3):
+            response = self.client.delete(reverse('materials:course-unsubscribe', kwargs={'pk': self.course.pk}))
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_204_NO_CONTENT
+        )
+
+    def test_invalidation(self):
+        """
+        Test changed and deleted courses are not served from the object cache.
+        """
+
+        self.client.post(reverse('materials:course-subscribe', kwargs={'pk': self.course.pk}))
+
+        self.course.title = 'changed'
+        self.course.save()
+
+        self.assertEqual(
+            get_cached_course(self.course.pk).title,
+            'changed'
+        )
+
+        course_pk = self.course.pk
+        self.course.delete()
+        response = self.client.post(reverse('materials:course-subscribe', kwargs={'pk': course_pk}))
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_404_NOT_FOUND
+        )
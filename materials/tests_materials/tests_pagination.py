@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from materials.models import Payments
+from users.models import User
+
+
+class KeysetPaginationTestCase(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        Payments.objects.bulk_create(
+            Payments(user=self.user, amount=i, payment_method='наличные') for i in range(10)
+        )
+        # several payments on the same date, pk has to break ties
+        for index, payment in enumerate(Payments.objects.order_by('pk')):
+            Payments.objects.filter(pk=payment.pk).update(payment_date=date(2023, 1, 1) + timedelta(days=index // 3))
+
+    def get_all_pages(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_200_OK
+            )
+
+            pages.append(response.json())
+            url = response.json()['next']
+        return pages
+
+    def test_payments_pages(self):
+        """
+        Test walking payments ordered by date through cursor pages.
+        """
+
+        pages = self.get_all_pages(reverse('materials:payments-list') + '?ordering=-payment_date&page_size=4')
+        ids = [payment['id'] for page in pages for payment in page['results']]
+
+        self.assertEqual(
+            ids,
+            list(Payments.objects.order_by('-payment_date', '-pk').values_list('pk', flat=True))
+        )
+
+        self.assertEqual(
+            [len(page['results']) for page in pages],
+            [4, 4, 2]
+        )
+
+        self.assertNotIn(
+            'count',
+            pages[0]
+        )
+
+        response = self.client.get(pages[2]['previous'])
+
+        self.assertEqual(
+            response.json()['results'],
+            pages[1]['results']
+        )
+
+    def test_payments_page_queries(self):
+        """
+        Test cursor page doesn't run COUNT and OFFSET queries.
+        """
+
+        first_page = self.client.get(reverse('materials:payments-list'), {'page_size': 4}).json()
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(first_page['next'])
+
+        self.assertEqual(
+            len(context),
+            1
+        )
+
+        self.assertNotIn(
+            'OFFSET',
+            context[0]['sql']
+        )
+
+    def test_invalid_cursor(self):
+        """
+        Test invalid cursor.
+        """
+
+        response = self.client.get(reverse('materials:payments-list'), {'cursor': 'invalid'})
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_404_NOT_FOUND
+        )
@@ -0,0 +1,126 @@
+import csv
+import json
+from datetime import date
+from io import StringIO
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from materials.models import Course, Lesson, Payments
+from users.models import User
+
+
+@override_settings(PAYMENTS_EXPORT_CHUNK_SIZE=2)
+class PaymentsExportTestCase(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='admin@test.ru',
+            password='test',
+            is_staff=True,
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.course = Course.objects.create(title='test', description='test')
+        self.lesson = Lesson.objects.create(title='test', description='test')
+        self.payments = Payments.objects.bulk_create(
+            Payments(user=self.user, amount=100 * i, payment_method=Payments.PAYMENT_METHOD[i % 2][0],
+                     **({'paid_course': self.course} if i % 3 else {'paid_lesson': self.lesson}))
+            for i in range(1, 8)
+        )
+        Payments.objects.filter(pk=self.payments[0].pk).update(payment_date=date(2023, 1, 1))
+
+    def export(self, **params):
+        response = self.client.get(reverse('materials:payments-export'), params)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        """
+        Test payments streamed as CSV in chunks.
+        """
+
+        response, content = self.export()
+
+        self.assertEqual(
+            (response.status_code, response['Content-Type'], response.streaming),
+            (status.HTTP_200_OK, 'text/csv; charset=utf-8', True)
+        )
+
+        rows = list(csv.DictReader(StringIO(content)))
+
+        self.assertEqual(
+            [(int(row['id']), int(row['amount'])) for row in rows],
+            [(payment.pk, payment.amount) for payment in self.payments]
+        )
+
+        self.assertEqual(
+            rows[1]['paid_course'],
+            str(self.course.pk)
+        )
+
+        # header and 7 payments in chunks of 2
+        response = self.client.get(reverse('materials:payments-export'))
+        self.assertEqual(
+            len(list(response.streaming_content)),
+            5
+        )
+
+    def test_ndjson_filters(self):
+        """
+        Test filtered payments streamed as NDJSON.
+        """
+
+        _, content = self.export(file_format='ndjson', paid_course=self.course.pk, payment_date__gte='2024-01-01')
+        payments = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(
+            [payment['id'] for payment in payments],
+            [payment.pk for payment in self.payments[1:] if payment.paid_course_id]
+        )
+
+        self.assertEqual(
+            payments[0]['paid_lesson'],
+            None
+        )
+
+        response = self.client.get(reverse('materials:payments-export'), {'file_format': 'xlsx'})
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_members(self):
+        """
+        Test export is not available to members.
+        """
+
+        member = User.objects.create(email='member@test.ru', password='test', role='member', is_active=True)
+        self.client.force_authenticate(user=member)
+
+        self.assertEqual(
+            self.client.get(reverse('materials:payments-export')).status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+
+    async def test_asgi(self):
+        """
+        Test payments streamed by an async iterator under ASGI.
+        """
+
+        response = await self.async_client.get(
+            reverse('materials:payments-export'), {'file_format': 'ndjson'},
+            AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+        chunks = [chunk async for chunk in response.streaming_content]
+
+        self.assertEqual(
+            [json.loads(line)['amount'] for chunk in chunks for line in chunk.decode().splitlines()],
+            [payment.amount for payment in self.payments]
+        )
@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import router
+from django.http import HttpResponse
+from django.test import SimpleTestCase, RequestFactory, override_settings
+
+from config.replicas import ReplicaMiddleware
+from materials.models import Course
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0', 'replica_1'])
+class ReplicaRouterTestCase(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory(HTTP_AUTHORIZATION='Bearer token')
+
+    def request(self, method, write=False, **headers):
+        """
+        Databases chosen for reads before and after an optional write in the view.
+        """
+        databases = []
+
+        def view(request):
+            databases.append(router.db_for_read(Course))
+            if write:
+                router.db_for_write(Course)
+            databases.append(router.db_for_read(Course))
+            return HttpResponse()
+
+        ReplicaMiddleware(view)(getattr(self.factory, method)('/', **headers))
+        return databases
+
+    def test_safe_requests(self):
+        """
+        Test reads of safe requests routed to replicas and everything else to the primary.
+        """
+
+        self.assertEqual(
+            {database for _ in range(20) for database in self.request('get')},
+            {'replica_0', 'replica_1'}
+        )
+
+        self.assertEqual(
+            self.request('post'),
+            ['default', 'default']
+        )
+
+        self.assertEqual(
+            [router.db_for_read(Course), router.db_for_write(Course)],
+            ['default', 'default']
+        )
+
+    def test_pinning(self):
+        """
+        Test client pinned to the primary after writing while other clients read from replicas.
+        """
+
+        self.request('patch')
+
+        self.assertEqual(
+            self.request('get'),
+            ['default', 'default']
+        )
+
+        self.assertNotIn(
+            'default',
+            self.request('get', HTTP_AUTHORIZATION='Bearer other')
+        )
+
+        cache.clear()
+        self.assertEqual(
+            self.request('get', write=True)[1],
+            'default'
+        )
+
+        self.assertEqual(
+            self.request('get'),
+            ['default', 'default']
+        )
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """
+        Test everything read from the primary without replicas.
+        """
+
+        self.assertEqual(
+            self.request('get'),
+            ['default', 'default']
+        )
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_local_cache(self):
+        """
+        Test replicas refused with a cache of one process, pins would not reach other workers.
+        """
+
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaMiddleware(HttpResponse)
@@ -0,0 +1,166 @@
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from materials.models import Course, Lesson, Subscription
+from users.models import User
+
+
+class ResponseCacheTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='moderator@test.ru',
+            password='test',
+            role='moderator',
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.course = Course.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+
+        self.lesson = Lesson.objects.create(
+            title='test',
+            description='test',
+            course=self.course,
+            owner=self.user
+        )
+
+    def test_cached_list(self):
+        """
+        Test repeated course list is served from cache without queries.
+        """
+
+        response = self.client.get(reverse('materials:course-list'))
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(reverse('materials:course-list'))
+
+        self.assertEqual(
+            cached_response.json(),
+            response.json()
+        )
+
+        self.assertEqual(
+            cached_response['ETag'],
+            response['ETag']
+        )
+
+    def test_conditional_get(self):
+        """
+        Test request with current ETag gets 304.
+        """
+
+        etag = self.client.get(reverse('materials:lesson-list'))['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('materials:lesson-list'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+    def test_lesson_change_invalidates(self):
+        """
+        Test lesson update invalidates lessons and courses responses.
+        """
+
+        lessons_etag = self.client.get(reverse('materials:lesson-list'))['ETag']
+        course_etag = self.client.get(reverse('materials:course-detail', kwargs={'pk': self.course.pk}))['ETag']
+
+        self.lesson.title = 'updated'
+        self.lesson.save()
+
+        response = self.client.get(reverse('materials:lesson-list'), HTTP_IF_NONE_MATCH=lessons_etag)
+
+        self.assertEqual(
+            response.json()['results'][0]['title'],
+            'updated'
+        )
+
+        response = self.client.get(reverse('materials:course-detail', kwargs={'pk': self.course.pk}),
+                                   HTTP_IF_NONE_MATCH=course_etag)
+
+        self.assertEqual(
+            response.json()['lesson'][0]['title'],
+            'updated'
+        )
+
+    def test_subscription_invalidates_own_responses(self):
+        """
+        Test subscription changes is_subscribe of the subscriber only.
+        """
+
+        other_user = User.objects.create(
+            email='moderator2@test.ru',
+            password='test',
+            role='moderator',
+
+            is_active=True,
+        )
+        other_client = APIClient()
+        other_client.force_authenticate(user=other_user)
+        url = reverse('materials:course-detail', kwargs={'pk': self.course.pk})
+
+        self.client.get(url)
+        other_client.get(url)
+
+        Subscription.objects.create(user=self.user, course=self.course)
+
+        self.assertTrue(
+            self.client.get(url).json()['is_subscribe']
+        )
+
+        with self.assertNumQueries(0):
+            response = other_client.get(url)
+
+        self.assertFalse(
+            response.json()['is_subscribe']
+        )
+
+    def test_demoted_user(self):
+        """
+        Test cached detail is not served to a moderator demoted to member.
+        """
+
+        owner = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        lesson = Lesson.objects.create(
+            title='test',
+            description='test',
+            owner=owner
+        )
+        url = reverse('materials:lesson-detail', kwargs={'pk': lesson.pk})
+
+        self.assertEqual(
+            self.client.get(url).status_code,
+            status.HTTP_200_OK
+        )
+
+        self.user.role = 'member'
+        self.user.save()
+
+        self.assertEqual(
+            self.client.get(url).status_code,
+            status.HTTP_403_FORBIDDEN
+        )
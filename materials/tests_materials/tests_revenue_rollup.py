@@ -0,0 +1,141 @@
+from datetime import date
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from materials.models import Course, Lesson, Payments, RevenueRollup
+from materials.tasks import revenue_rollup
+from users.models import User
+
+
+@override_settings(REVENUE_ROLLUP_BATCH_SIZE=2)
+class RevenueRollupTestCase(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='admin@test.ru',
+            password='test',
+
+            is_staff=True,
+            is_active=True,
+            is_superuser=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.course = Course.objects.create(title='test', description='test')
+        self.lesson = Lesson.objects.create(title='test', description='test')
+
+    def create_payments(self, *payments):
+        created = Payments.objects.bulk_create(
+            Payments(user=self.user, amount=amount, payment_method=method, **material)
+            for material, amount, method in payments
+        )
+        Payments.objects.filter(pk__in=[payment.pk for payment in created]).update(payment_date=date(2023, 1, 1))
+
+    def get_rollups(self):
+        return {
+            (rollup.paid_course_id, rollup.paid_lesson_id, rollup.payment_method): (rollup.amount,
+                                                                                    rollup.payments_count)
+            for rollup in RevenueRollup.objects.all()
+        }
+
+    def test_incremental_rollup(self):
+        """
+        Test rollups add only payments created since the previous run.
+        """
+
+        course, lesson = {'paid_course': self.course}, {'paid_lesson': self.lesson}
+        self.create_payments(
+            (course, 100, 'наличные'),
+            (course, 100, 'наличные'),
+            (course, 150, 'перевод на счет'),
+            (lesson, 50, 'наличные'),
+        )
+
+        self.assertEqual(
+            revenue_rollup(),
+            4
+        )
+
+        self.assertEqual(
+            self.get_rollups(),
+            {
+                (self.course.pk, None, 'наличные'): (200, 2),
+                (self.course.pk, None, 'перевод на счет'): (150, 1),
+                (None, self.lesson.pk, 'наличные'): (50, 1),
+            }
+        )
+
+        self.create_payments((course, 100, 'наличные'))
+
+        self.assertEqual(
+            revenue_rollup(),
+            1
+        )
+
+        self.assertEqual(
+            self.get_rollups()[(self.course.pk, None, 'наличные')],
+            (300, 3)
+        )
+
+        self.assertEqual(
+            revenue_rollup(),
+            0
+        )
+
+    def test_late_payment(self):
+        """
+        Test payment committed after a payment with a greater pk counted by the next run.
+        """
+
+        Payments.objects.create(pk=1000, user=self.user, amount=100, payment_method='наличные',
+                                paid_course=self.course)
+        Payments.objects.filter(pk=1000).update(payment_date=date(2023, 1, 1))
+        revenue_rollup()
+        self.create_payments(({'paid_course': self.course}, 50, 'наличные'))
+
+        self.assertEqual(
+            revenue_rollup(),
+            1
+        )
+
+        self.assertEqual(
+            self.get_rollups(),
+            {(self.course.pk, None, 'наличные'): (150, 2)}
+        )
+
+    def test_revenue_list(self):
+        """
+        Test revenue report filtered by course and date range.
+        """
+
+        self.create_payments(({'paid_course': self.course}, 100, 'наличные'))
+        revenue_rollup()
+
+        response = self.client.get(
+            reverse('materials:revenue-list'),
+            {'paid_course': self.course.pk, 'date__gte': '2023-01-01', 'date__lte': '2023-12-31'}
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertEqual(
+            [(row['date'], row['amount'], row['payments_count']) for row in response.json()['results']],
+            [('2023-01-01', 100, 1)]
+        )
+
+        response = self.client.get(
+            reverse('materials:revenue-list'),
+            {'date__gte': '2024-01-01'}
+        )
+
+        self.assertEqual(
+            response.json()['results'],
+            []
+        )
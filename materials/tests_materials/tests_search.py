@@ -0,0 +1,123 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from materials.models import Course, Lesson
+from materials.search import fallback_search
+from users.models import User
+
+
+class SearchTestCase(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='moderator@test.ru',
+            password='test',
+            role='moderator',
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.course = Course.objects.create(
+            title='Основы программирования',
+            description='Переменные, циклы и функции на Python',
+            owner=self.user
+        )
+        self.lesson = Lesson.objects.create(
+            title='Циклы',
+            description='Циклы for и while в примерах программирования на Python',
+            course=self.course,
+            owner=self.user
+        )
+        Lesson.objects.create(
+            title='Функции',
+            description='Аргументы и возвращаемые значения',
+            course=self.course,
+            owner=self.user
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', 'full-text search of PostgreSQL')
+    def test_search(self):
+        """
+        Test search by word forms with title matches ranked first and highlighted headlines.
+        """
+
+        response = self.client.get(reverse('materials:search'), {'q': 'программирование'})
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertEqual(
+            [course['id'] for course in response.json()['courses']],
+            [self.course.pk]
+        )
+
+        self.assertEqual(
+            [(lesson['id'], lesson['course']) for lesson in response.json()['lessons']],
+            [(self.lesson.pk, self.course.pk)]
+        )
+
+        self.assertIn(
+            '<b>программирования</b>',
+            response.json()['lessons'][0]['headline']
+        )
+
+        response = self.client.get(reverse('materials:search'), {'q': 'циклы'})
+
+        # title match outranks description match
+        self.assertEqual(
+            [result['title'] for result in response.json()['courses'] + response.json()['lessons']],
+            ['Основы программирования', 'Циклы']
+        )
+
+        self.assertGreater(
+            response.json()['lessons'][0]['rank'],
+            response.json()['courses'][0]['rank']
+        )
+
+    def test_search_members(self):
+        """
+        Test members find only their own courses and a query is required.
+        """
+
+        member = User.objects.create(email='member@test.ru', password='test', role='member', is_active=True)
+        self.client.force_authenticate(user=member)
+
+        response = self.client.get(reverse('materials:search'), {'q': 'циклы'})
+
+        self.assertEqual(
+            (response.json()['courses'], len(response.json()['lessons'])),
+            ([], 1)
+        )
+
+        response = self.client.get(reverse('materials:search'), {'q': ' '})
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    def test_fallback(self):
+        """
+        Test substring search on databases without full-text search ignores case of non-ASCII letters.
+        """
+
+        lessons = fallback_search(Lesson.objects.all(), 'циклы')
+
+        self.assertEqual(
+            [(lesson.title, lesson.rank) for lesson in lessons],
+            [('Циклы', 1.0)]
+        )
+
+        # special characters of regular expressions match themselves
+        self.assertEqual(
+            list(fallback_search(Lesson.objects.all(), 'c++')),
+            []
+        )
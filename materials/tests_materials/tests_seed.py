@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from materials.models import Course, Lesson, Payments, Subscription
+from users.models import User
+
+SEED_OPTIONS = {'users': 30, 'courses': 5, 'lessons_per_course': 3, 'subscriptions': 40, 'payments': 200,
+                'batch_size': 7, 'stdout': StringIO()}
+
+
+class SeedTestCase(TestCase):
+
+    @staticmethod
+    def dump():
+        return {
+            'users': list(User.objects.order_by('pk').values_list('email', 'role')),
+            'courses': list(Course.objects.order_by('pk').values_list('title', 'price', 'owner__email')),
+            'lessons': list(Lesson.objects.order_by('pk').values_list('title', 'course__title', 'owner__email')),
+            'subscriptions': list(Subscription.objects.order_by('pk').values_list('user__email', 'course__title')),
+            'payments': list(Payments.objects.order_by('pk').values_list(
+                'user__email', 'paid_course__title', 'paid_lesson__title', 'amount', 'payment_method', 'payment_date'
+            )),
+        }
+
+    def test_seed(self):
+        """
+        Test seeding all models.
+        """
+
+        call_command('seed', **SEED_OPTIONS)
+
+        self.assertEqual(
+            [User.objects.count(), Course.objects.count(), Lesson.objects.count(), Subscription.objects.count(),
+             Payments.objects.count()],
+            [30, 5, 15, 40, 200]
+        )
+
+        self.assertTrue(
+            User.objects.order_by('?').first().check_password('qwe123')
+        )
+
+        self.assertFalse(
+            Payments.objects.filter(paid_course__isnull=True, paid_lesson__isnull=True).exists()
+        )
+
+        # counters of bulk inserted lessons and subscriptions
+        self.assertEqual(
+            Course.objects.recount(),
+            0
+        )
+
+        with self.assertRaises(CommandError):
+            call_command('seed', **SEED_OPTIONS)
+
+    def test_deterministic(self):
+        """
+        Test the same seed generates the same data by COPY and INSERT.
+        """
+
+        call_command('seed', **SEED_OPTIONS)
+        data = self.dump()
+        User.objects.all().delete()
+        Course.objects.all().delete()
+
+        call_command('seed', no_copy=True, **SEED_OPTIONS)
+
+        self.assertEqual(
+            self.dump(),
+            data
+        )
@@ -0,0 +1,144 @@
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from materials.caching import get_cached_course
+from materials.models import Course, Lesson, StripeProduct
+from materials.tests_materials.stripe_stub import StripeStub
+from users.models import User
+
+
+class StripeCatalogTestCase(APITestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stripe = StripeStub().start()
+        cls.settings_override = override_settings(STRIPE_SECRET_KEY='sk_test_stub', STRIPE_API_BASE=cls.stripe.url)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.stripe.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.course = Course.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+
+        self.lesson = Lesson.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+
+        self.stripe.calls.clear()
+
+    def buy_course(self):
+        response = self.client.post(
+            f'/course/{self.course.pk}/buy/'
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        return response
+
+    def test_warm_purchase(self):
+        """
+        Test repeated course purchase creates only stripe session.
+        """
+
+        self.buy_course()
+        self.buy_course()
+
+        self.assertEqual(
+            dict(self.stripe.calls),
+            {'/v1/products': 1, '/v1/prices': 1, '/v1/checkout/sessions': 2}
+        )
+
+        self.assertEqual(
+            StripeProduct.objects.filter(course=self.course).count(),
+            1
+        )
+
+    def test_price_and_title_change(self):
+        """
+        Test changed course price creates new stripe price and changed title renames stripe product.
+        """
+
+        self.buy_course()
+        price_id = StripeProduct.objects.get(course=self.course).price_id
+
+        self.course.price = 200
+        self.course.save()
+        self.buy_course()
+
+        stripe_product = StripeProduct.objects.get(course=self.course)
+        self.assertNotEqual(
+            stripe_product.price_id,
+            price_id
+        )
+
+        self.course.title = 'test2'
+        self.course.save()
+        self.buy_course()
+
+        self.assertEqual(
+            dict(self.stripe.calls),
+            {'/v1/products': 1, f'/v1/products/{stripe_product.product_id}': 1, '/v1/prices': 2,
+             '/v1/checkout/sessions': 3}
+        )
+
+    def test_price_not_cached(self):
+        """
+        Test course purchase uses the current price, not the course from the object cache.
+        """
+
+        get_cached_course(self.course.pk)
+        # another process changed the price, this process still has the course cached
+        Course.objects.filter(pk=self.course.pk).update(price=300)
+        self.buy_course()
+
+        self.assertEqual(
+            StripeProduct.objects.get(course=self.course).price,
+            300
+        )
+
+    def test_lesson_purchase(self):
+        """
+        Test lesson purchase returns payment url.
+        """
+
+        response = self.client.post(
+            f'/lesson/{self.lesson.pk}/buy/'
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertTrue(
+            response.json()['Payment url'].startswith('https://checkout.stripe.com/')
+        )
+
+        self.assertTrue(
+            StripeProduct.objects.filter(lesson=self.lesson).exists()
+        )
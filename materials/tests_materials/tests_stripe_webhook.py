@@ -0,0 +1,213 @@
+import hashlib
+import hmac
+import json
+import time
+from pathlib import Path
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from config.celery import app
+from materials.models import Course, Lesson, Payments, StripeEvent
+from materials.services import create_stripe_payments
+from users.models import User
+
+EVENTS_DIR = Path(__file__).resolve().parent / 'stripe_events'
+WEBHOOK_SECRET = 'whsec_test'
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.course = Course.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+        self.lesson = Lesson.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+
+        app.conf.task_always_eager = True
+
+    def tearDown(self):
+        app.conf.task_always_eager = False
+        super().tearDown()
+
+    def load_event(self, name, **session):
+        """
+        Recorded stripe event linked to test user and materials.
+        """
+        event = json.loads((EVENTS_DIR / f'{name}.json').read_text())
+        checkout_session = event['data']['object']
+        checkout_session['client_reference_id'] = str(self.user.pk)
+        if 'course' in checkout_session['metadata']:
+            checkout_session['metadata']['course'] = str(self.course.pk)
+        if 'lesson' in checkout_session['metadata']:
+            checkout_session['metadata']['lesson'] = str(self.lesson.pk)
+        checkout_session.update(session)
+        return event
+
+    def post_event(self, event, secret=WEBHOOK_SECRET):
+        payload = json.dumps(event)
+        timestamp = int(time.time())
+        signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('materials:stripe-webhook'),
+                payload,
+                content_type='application/json',
+                HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}'
+            )
+
+    def test_checkout_completed(self):
+        """
+        Test payment created from paid checkout session.
+        """
+
+        response = self.post_event(self.load_event('checkout.session.completed'))
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertEqual(
+            list(Payments.objects.values_list('user', 'paid_course', 'paid_lesson', 'amount', 'stripe_session_id')),
+            [(self.user.pk, self.course.pk, None, 1000, 'cs_test_a1Bc2De3Fg4Hi5Jk6Lm7No8Pq9Rs0Tu')]
+        )
+
+        self.assertFalse(
+            StripeEvent.objects.filter(processed_at__isnull=True).exists()
+        )
+
+    def test_retries(self):
+        """
+        Test retried events and several events of one session create one payment.
+        """
+
+        self.post_event(self.load_event('checkout.session.completed'))
+        self.post_event(self.load_event('checkout.session.completed'))
+        self.post_event(self.load_event('checkout.session.async_payment_succeeded'))
+
+        self.assertEqual(
+            StripeEvent.objects.count(),
+            2
+        )
+
+        self.assertEqual(
+            Payments.objects.count(),
+            1
+        )
+
+    def test_not_paid(self):
+        """
+        Test events without paid session and sessions of deleted materials don't create payments.
+        """
+
+        self.post_event(self.load_event('checkout.session.expired'))
+        self.post_event(self.load_event('checkout.session.completed', payment_status='unpaid'))
+
+        event = self.load_event('checkout.session.completed', id='cs_test_deleted')
+        event['id'] = 'evt_deleted'
+        self.course.delete()
+        self.post_event(event)
+
+        self.assertFalse(
+            Payments.objects.exists()
+        )
+
+        self.assertEqual(
+            StripeEvent.objects.filter(processed_at__isnull=False).count(),
+            3
+        )
+
+    def test_bad_signature(self):
+        """
+        Test event with wrong signature is rejected.
+        """
+
+        response = self.post_event(self.load_event('checkout.session.completed'), secret='whsec_other')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+        self.assertFalse(
+            StripeEvent.objects.exists()
+        )
+
+    def test_malformed(self):
+        """
+        Test malformed paid session skipped without stopping processing of later events.
+        """
+
+        app.conf.task_always_eager = False
+        paid = self.load_event('checkout.session.completed')
+        malformed = self.load_event('checkout.session.completed', id='cs_malformed')
+        del malformed['data']['object']['amount_total']
+        StripeEvent.objects.bulk_create([
+            StripeEvent(event_id='evt_malformed', type='checkout.session.completed', payload=malformed),
+            StripeEvent(event_id='evt_no_session', type='checkout.session.completed', payload={'data': None}),
+            StripeEvent(event_id='evt_paid', type='checkout.session.completed', payload=paid),
+        ])
+
+        with self.assertLogs('materials.services', 'WARNING'):
+            self.assertEqual(
+                create_stripe_payments(batch_size=10),
+                3
+            )
+
+        self.assertEqual(
+            list(Payments.objects.values_list('stripe_session_id', flat=True)),
+            [paid['data']['object']['id']]
+        )
+
+    @override_settings(STRIPE_WEBHOOK_SECRET=None)
+    def test_no_secret(self):
+        """
+        Test events rejected while the webhook secret is not configured.
+        """
+
+        response = self.post_event(self.load_event('checkout.session.completed'))
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    def test_batches(self):
+        """
+        Test stored events processed in batches.
+        """
+
+        app.conf.task_always_eager = False
+        StripeEvent.objects.bulk_create(
+            StripeEvent(event_id=f'evt_{i}', type='checkout.session.completed', payload=self.load_event(
+                'checkout.session.completed', id=f'cs_{i}'
+            )) for i in range(5)
+        )
+
+        self.assertEqual(
+            create_stripe_payments(batch_size=2),
+            5
+        )
+
+        self.assertEqual(
+            Payments.objects.count(),
+            5
+        )
@@ -0,0 +1,163 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from config.celery import app
+from materials.models import Course, Lesson
+from users.models import User
+
+
+def make_image(name, size=(1200, 800), fmt='JPEG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format=fmt)
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+class MediaRootMixin:
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+
+class ThumbnailsTestCase(MediaRootMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        app.conf.task_always_eager = True
+
+    def tearDown(self):
+        app.conf.task_always_eager = False
+        super().tearDown()
+
+    def test_thumbnails(self):
+        """
+        Test thumbnails made after upload and exposed by serializer.
+        """
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('materials:course-list'),
+                {'title': 'test', 'description': 'test', 'preview': make_image('preview.jpg')},
+                format='multipart'
+            )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED
+        )
+
+        response = self.client.get(reverse('materials:course-detail', kwargs={'pk': response.json()['id']}))
+        thumbnails = response.json()['preview_thumbnails']
+
+        self.assertEqual(
+            {size: sorted(urls) for size, urls in thumbnails.items()},
+            {'small': ['jpeg', 'webp'], 'medium': ['jpeg', 'webp']}
+        )
+
+        self.assertTrue(
+            thumbnails['small']['webp'].startswith('http://testserver/media/thumbnails/course/preview')
+        )
+
+        name = Course.objects.get().preview_thumbnails['medium']['webp']
+        with default_storage.open(name) as file, Image.open(file) as image:
+            self.assertEqual(
+                (image.format, image.size),
+                ('WEBP', (640, 360))
+            )
+
+    def test_replaced(self):
+        """
+        Test thumbnails of a replaced image are not served until new ones are made.
+        """
+
+        lesson = Lesson.objects.create(title='test', description='test', owner=self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.preview = make_image('first.png', size=(300, 300), fmt='PNG')
+            lesson.save()
+
+        lesson.refresh_from_db()
+        first = lesson.preview_thumbnails
+
+        lesson.preview = make_image('second.jpg')
+        with self.captureOnCommitCallbacks() as callbacks:
+            lesson.save()
+
+        response = self.client.get(reverse('materials:lesson-detail', kwargs={'pk': lesson.pk}))
+
+        self.assertIsNone(
+            response.json()['preview_thumbnails']
+        )
+
+        for callback in callbacks:
+            callback()
+        lesson.refresh_from_db()
+
+        self.assertNotEqual(
+            lesson.preview_thumbnails['small']['jpeg'],
+            first['small']['jpeg']
+        )
+
+        self.assertEqual(
+            lesson.preview_thumbnails['source'],
+            lesson.preview.name
+        )
+
+        self.assertFalse(
+            default_storage.exists(first['small']['jpeg'])
+        )
+
+
+class BackfillThumbnailsTestCase(MediaRootMixin, TransactionTestCase):
+
+    def test_backfill(self):
+        """
+        Test thumbnails of existing images made by a pool of processes, broken images don't stop the others.
+        """
+
+        names = [default_storage.save(f'course/{i}.jpg', make_image(f'{i}.jpg')) for i in range(3)]
+        Course.objects.bulk_create(
+            Course(title='test', description='test', preview=name) for name in names
+        )
+        User.objects.bulk_create([
+            User(email='broken@test.ru', avatar=default_storage.save('users/broken.jpg', ContentFile(b'broken'))),
+        ])
+
+        stdout = StringIO()
+        call_command('backfill_thumbnails', workers=2, chunk_size=1, stdout=stdout)
+
+        self.assertEqual(
+            stdout.getvalue().strip(),
+            'thumbnails: 3 images, 1 failed of 4'
+        )
+
+        self.assertFalse(
+            Course.objects.filter(preview_thumbnails__isnull=True).exists()
+        )
@@ -0,0 +1,93 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from materials.models import Lesson
+from users.models import User
+
+backfill_video_id = import_module('materials.migrations.0012_lesson_video_id').backfill_video_id
+
+
+class LessonVideoIdTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_save(self):
+        """
+        Test video id extracted from YouTube link on save.
+        """
+
+        lesson = Lesson.objects.create(
+            title='test',
+            description='test',
+            video_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42',
+            owner=self.user
+        )
+
+        self.assertEqual(
+            lesson.video_id,
+            'dQw4w9WgXcQ'
+        )
+
+        lesson.video_url = None
+        lesson.save(update_fields=['video_url'])
+        lesson.refresh_from_db()
+
+        self.assertIsNone(
+            lesson.video_id
+        )
+
+    def test_backfill(self):
+        """
+        Test video id of existing lessons filled by migration.
+        """
+
+        Lesson.objects.bulk_create([
+            Lesson(title='test', description='test', video_url=f'youtube.com/watch?v=video{i}') for i in range(3)
+        ] + [
+            Lesson(title='test', description='test', video_url='https://rutube.ru/video/1/'),
+            Lesson(title='test', description='test'),
+        ])
+
+        backfill_video_id(apps, None)
+
+        self.assertEqual(
+            list(Lesson.objects.order_by('pk').values_list('video_id', flat=True)),
+            ['video0', 'video1', 'video2', None, None]
+        )
+
+    def test_filter(self):
+        """
+        Test lessons list filtered by video id.
+        """
+
+        for video_url in ['https://youtube.com/watch?v=abc', 'https://youtube.com/watch?v=xyz',
+                          'https://www.youtube.com/watch?v=abc']:
+            Lesson.objects.create(title='test', description='test', video_url=video_url, owner=self.user)
+
+        response = self.client.get(reverse('materials:lesson-list'), {'video_id': 'abc'})
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertEqual(
+            [lesson['video_url'] for lesson in response.json()['results']],
+            ['https://youtube.com/watch?v=abc', 'https://www.youtube.com/watch?v=abc']
+        )
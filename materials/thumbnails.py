@@ -0,0 +1,121 @@
+"""
+Fixed-size thumbnails of uploaded images.
+
+Thumbnails of an image field `<field>` are stored next to media as `thumbnails/<name>_<size>.<format>`,
+their names are saved in the `<field>_thumbnails` JSON field of the model with the source image name,
+so thumbnails of a replaced image are not served.
+"""
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True},
+}
+
+
+def get_thumbnails_field(field_name):
+    return f'{field_name}_thumbnails'
+
+
+def is_stale(instance, field_name):
+    """
+    Whether the image is set and its thumbnails are missing or made of another image.
+    """
+    image = getattr(instance, field_name)
+    thumbnails = getattr(instance, get_thumbnails_field(field_name))
+    return bool(image) and (thumbnails is None or thumbnails.get('source') != image.name)
+
+
+def render_thumbnail(image, size, fmt):
+    """
+    Crop the image to the size keeping its center and encode in the format.
+    """
+    thumbnail = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    if fmt == 'jpeg' and thumbnail.mode != 'RGB':
+        thumbnail = thumbnail.convert('RGB')
+    buffer = BytesIO()
+    thumbnail.save(buffer, **FORMATS[fmt])
+    return buffer.getvalue()
+
+
+def make_thumbnails(model_label, pk, field_name):
+    """
+    Make thumbnails of all sizes and formats of the image field, return False if there was nothing to make.
+    """
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not is_stale(instance, field_name):
+        return False
+
+    image_file = getattr(instance, field_name)
+    storage = image_file.storage
+    old_thumbnails = getattr(instance, get_thumbnails_field(field_name)) or {}
+    root = os.path.splitext(image_file.name)[0]
+    sizes = settings.THUMBNAIL_SIZES[field_name]
+    largest = (max(width for width, _ in sizes.values()), max(height for _, height in sizes.values()))
+
+    with image_file.open('rb'), Image.open(image_file) as image:
+        # JPEG is decoded at reduced scale close to the largest thumbnail, much faster for big photos
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        thumbnails = {'source': image_file.name}
+        for size_name, size in sizes.items():
+            thumbnails[size_name] = {}
+            for fmt in settings.THUMBNAIL_FORMATS:
+                name = f'thumbnails/{root}_{size_name}.{fmt}'
+                storage.delete(name)
+                thumbnails[size_name][fmt] = storage.save(name, ContentFile(render_thumbnail(image, size, fmt)))
+
+    # post_save signals invalidate cached responses, the image is not touched if it has been replaced meanwhile
+    setattr(instance, get_thumbnails_field(field_name), thumbnails)
+    instance.save(update_fields=[get_thumbnails_field(field_name)])
+
+    # thumbnails of the previous image are not referred to anymore, ones with the same name are already replaced
+    names = {name for size_name, size in thumbnails.items() if size_name != 'source' for name in size.values()}
+    for size_name, size in old_thumbnails.items():
+        if size_name != 'source':
+            for name in set(size.values()) - names:
+                storage.delete(name)
+    return True
+
+
+def get_thumbnail_urls(instance, field_name, request=None):
+    """
+    Urls of thumbnails by size and format, None until thumbnails of the current image are made.
+    """
+    if is_stale(instance, field_name) or not getattr(instance, field_name):
+        return None
+
+    storage = getattr(instance, field_name).storage
+    thumbnails = getattr(instance, get_thumbnails_field(field_name))
+    urls = {}
+    for size_name in settings.THUMBNAIL_SIZES[field_name]:
+        if size_name not in thumbnails:
+            return None
+        urls[size_name] = {}
+        for fmt, name in thumbnails[size_name].items():
+            url = storage.url(name)
+            urls[size_name][fmt] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def get_stale_thumbnails():
+    """
+    (model label, pk, image field) of all images without thumbnails of the current image.
+    """
+    for model_label, field_name in settings.THUMBNAIL_FIELDS:
+        model = apps.get_model(model_label)
+        thumbnails_field = get_thumbnails_field(field_name)
+        images = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+        for pk, name, thumbnails in images.values_list('pk', field_name, thumbnails_field).iterator():
+            if thumbnails is None or thumbnails.get('source') != name:
+                yield model_label, pk, field_name
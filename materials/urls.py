@@ -5,7 +5,8 @@ from rest_framework import routers
 
 from materials.views import CourseViewSet, LessonCreateAPIView, LessonListAPIView, LessonRetrieveAPIView, \
     LessonUpdateAPIView, LessonDestroyAPIView, PaymentsListAPIView, SubscriptionCreateAPIView, \
-    SubscriptionDestroyApiView, LessonBuyAPIView, CourseBuyAPIView
+    SubscriptionDestroyApiView, LessonBuyAPIView, CourseBuyAPIView, LessonBuyAsyncView, CourseBuyAsyncView, \
+    RevenueListAPIView, LessonBulkAPIView, StripeWebhookView, SearchAPIView, PaymentsExportAPIView
 
 app_name = MaterialsConfig.name
 
@@ -14,13 +15,18 @@ router.register(r'course', CourseViewSet, basename='course')
 
 urlpatterns = [
     path('lesson/create/', LessonCreateAPIView.as_view(), name='lesson-create'),
+    path('lesson/bulk/', LessonBulkAPIView.as_view(), name='lesson-bulk'),
     path('lesson/', LessonListAPIView.as_view(), name='lesson-list'),
     path('lesson/<int:pk>/', LessonRetrieveAPIView.as_view(), name='lesson-detail'),
     path('lesson/update/<int:pk>/', LessonUpdateAPIView.as_view(), name='lesson-update'),
     path('lesson/delete/<int:pk>/', LessonDestroyAPIView.as_view(), name='lesson-delete'),
 
+    path('search/', SearchAPIView.as_view(), name='search'),
+
     # payments
     path('payments/', PaymentsListAPIView.as_view(), name='payments-list'),
+    path('payments/export/', PaymentsExportAPIView.as_view(), name='payments-export'),
+    path('payments/revenue/', RevenueListAPIView.as_view(), name='revenue-list'),
 
     # subscription
     path('course/<int:pk>/subscribe/', SubscriptionCreateAPIView.as_view(), name='course-subscribe'),
@@ -29,5 +35,8 @@ urlpatterns = [
     # stipe payment
     path('lesson/<int:pk>/buy/', LessonBuyAPIView.as_view(), name='create-payment'),
     path('course/<int:pk>/buy/', CourseBuyAPIView.as_view(), name='create-payment'),
+    path('lesson/<int:pk>/buy/async/', LessonBuyAsyncView.as_view(), name='lesson-buy-async'),
+    path('course/<int:pk>/buy/async/', CourseBuyAsyncView.as_view(), name='course-buy-async'),
+    path('stripe/webhook/', StripeWebhookView.as_view(), name='stripe-webhook'),
 
 ] + router.urls
@@ -1,6 +1,16 @@
 import re
 from rest_framework.serializers import ValidationError
 
+YOUTUBE_URL = re.compile(r"^(?:https?://)?(?:www\.)?youtube\.com/watch[?]v=(?P<video_id>[a-zA-Z0-9_-]+)")
+
+
+def get_youtube_video_id(url):
+    """
+    Video id of a YouTube link, None for empty and other links.
+    """
+    match = YOUTUBE_URL.match(url) if url else None
+    return match['video_id'] if match else None
+
 
 class UrlsValidator:
 
@@ -8,9 +18,8 @@ class UrlsValidator:
         self.field = field
 
     def __call__(self, value):
-        reg = re.compile(r"^((https?://)?(www.)?(youtube.com/watch[?]v=)[a-zA-Z0-9_-]+)")
         link = dict(value).get(self.field)
         if link is None:
             return None
-        elif not bool(reg.search(link)):
+        elif YOUTUBE_URL.match(link) is None:
             raise ValidationError('Видео может быть только с YouTube')
@@ -1,23 +1,52 @@
+import json
+
+import httpx
+import stripe
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, viewsets, status
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.request import Request
 from rest_framework.views import APIView
 
-from materials.models import Course, Lesson, Payments, Subscription
-from materials.paginators import MyPagination
+from materials.caching import CachedResponseMixin, invalidate_responses, get_cached_course
+from materials.exports import CONTENT_TYPES, export_rows, aexport_rows
+from materials.models import Course, Lesson, Payments, RevenueRollup, StripeEvent, Subscription
+from materials.paginators import KeysetPagination
 from materials.permissions import IsModerator, IsMaterialsOwner
-from materials.serializers import CourseSerializer, LessonSerializer, PaymentSerializer, SubscriptionSerializer
-from materials.services import stripe_payment_created
-from materials.tasks import subscription_send_mail
+from materials.search import search
+from materials.serializers import CourseSerializer, LessonSerializer, PaymentSerializer, SubscriptionSerializer, \
+    RevenueRollupSerializer, LessonBulkSerializer, CourseSearchSerializer, LessonSearchSerializer
+from materials.services import stripe_payment_created, astripe_payment_created
+from materials.tasks import course_update_fan_out, process_stripe_events
+from monitoring.mixins import SerializerTimingMixin
+from users.authentication import ClaimsJWTAuthentication
 from users.models import UserRole
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+def get_course_or_404(pk):
+    course = get_cached_course(pk)
+    if course is None:
+        raise Http404
+    return course
+
+
+class CourseViewSet(CachedResponseMixin, SerializerTimingMixin, viewsets.ModelViewSet):
     serializer_class = CourseSerializer
-    pagination_class = MyPagination
+    pagination_class = KeysetPagination
+    filter_backends = [OrderingFilter]
+    ordering_fields = ('subscribers_count', 'lessons_count')
+    per_user = True
 
     def get_permissions(self):
         if self.action == 'create':
@@ -33,50 +62,152 @@ class CourseViewSet(viewsets.ModelViewSet):
 
         return [permission() for permission in permission_classes]
 
+    def get_cache_scopes(self, request):
+        # is_subscribe depends on subscriptions of the user
+        return 'course', f'subscription:{request.user.pk}'
+
     def get_queryset(self):
         if self.request.user.role == UserRole.MEMBER:
-            return Course.objects.filter(owner=self.request.user)
+            queryset = Course.objects.filter(owner_id=self.request.user.pk)
         else:
-            return Course.objects.all()
+            queryset = Course.objects.all()
+
+        return queryset.annotate(
+            is_subscribe=Exists(
+                Subscription.objects.filter(course=OuterRef('pk'), user_id=self.request.user.pk)
+            ),
+        ).prefetch_related(
+            Prefetch('lesson', queryset=Lesson.objects.order_by('pk'))
+        )
 
     def perform_create(self, serializer):
         new_course = serializer.save()
-        new_course.owner = self.request.user
+        new_course.owner_id = self.request.user.pk
         new_course.save()
 
     def perform_update(self, serializer):
         updated_course = serializer.save()
-        subscription = Subscription.objects.get(course=updated_course.pk)
-        sub_users = subscription.user.email
-        course_name = updated_course.title
-        subscription_send_mail.delay(course_name, sub_users)
+        course_update_fan_out.delay(updated_course.pk, updated_course.title)
 
 
-class LessonCreateAPIView(generics.CreateAPIView):
+class LessonCreateAPIView(SerializerTimingMixin, generics.CreateAPIView):
     serializer_class = LessonSerializer
     permission_classes = [IsAuthenticated, IsAdminUser | ~IsModerator]
 
     def perform_create(self, serializer):
         new_lesson = serializer.save()
-        new_lesson.owner = self.request.user
+        new_lesson.owner_id = self.request.user.pk
         new_lesson.save()
         return super().perform_create(serializer)
 
 
-class LessonListAPIView(generics.ListAPIView):
+class LessonBulkAPIView(SerializerTimingMixin, generics.GenericAPIView):
+    """
+    Create lessons without id and update lessons with id from a list in one transaction.
+
+    Invalid lessons are answered with their errors and don't stop the others.
+    """
+    serializer_class = LessonBulkSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'detail': 'Ожидается список уроков'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.LESSON_BULK_MAX_SIZE:
+            return Response({'detail': f'Не больше {settings.LESSON_BULK_MAX_SIZE} уроков за запрос'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        objects = [item for item in items if isinstance(item, dict)]
+        lessons = Lesson.objects.in_bulk([item['id'] for item in objects if isinstance(item.get('id'), int)])
+        courses = Course.objects.in_bulk([item['course'] for item in objects if isinstance(item.get('course'), int)])
+        context = {**self.get_serializer_context(), 'courses': courses}
+
+        results, to_create, to_update, update_fields, seen = [], [], [], set(), set()
+        for item in items:
+            lesson = None
+            if not isinstance(item, dict):
+                results.append({'non_field_errors': ['Ожидается объект урока']})
+                continue
+            if 'id' in item:
+                lesson = lessons.get(item['id']) if isinstance(item['id'], int) else None
+                if lesson is None:
+                    results.append({'id': ['Урок не найден']})
+                    continue
+                if lesson.pk in seen:
+                    results.append({'id': ['Урок повторяется в запросе']})
+                    continue
+                seen.add(lesson.pk)
+                if not self.can_update(lesson):
+                    results.append({'id': [IsMaterialsOwner.message]})
+                    continue
+            elif not self.can_create():
+                results.append({'non_field_errors': ['Модератор не может создавать уроки']})
+                continue
+
+            serializer = self.get_serializer(lesson, data=item, partial=lesson is not None, context=context)
+            if not serializer.is_valid():
+                results.append(serializer.errors)
+                continue
+
+            data = serializer.validated_data
+            data.pop('id', None)
+            if lesson is None:
+                lesson = Lesson(**data, owner_id=request.user.pk)
+                to_create.append(lesson)
+            else:
+                for field, value in data.items():
+                    setattr(lesson, field, value)
+                to_update.append(lesson)
+                update_fields.update(data)
+            # bulk queries don't call save()
+            lesson.set_video_id()
+            results.append(lesson)
+
+        if 'video_url' in update_fields:
+            update_fields.add('video_id')
+
+        with transaction.atomic():
+            Lesson.objects.bulk_create(to_create)
+            if update_fields:
+                Lesson.objects.bulk_update(to_update, update_fields)
+        if to_create or to_update:
+            # bulk queries don't send model signals
+            invalidate_responses('lesson', 'course')
+
+        response_status = status.HTTP_200_OK if to_create or to_update else status.HTTP_400_BAD_REQUEST
+        return Response([
+            {'lesson': self.get_serializer(result).data} if isinstance(result, Lesson) else {'errors': result}
+            for result in results
+        ], status=response_status)
+
+    def can_create(self):
+        return self.request.user.is_staff or self.request.user.role != UserRole.MODERATOR
+
+    def can_update(self, lesson):
+        user = self.request.user
+        return user.is_staff or user.role == UserRole.MODERATOR or lesson.owner_id == user.pk
+
+
+class LessonListAPIView(CachedResponseMixin, SerializerTimingMixin, generics.ListAPIView):
     serializer_class = LessonSerializer
+    cache_scopes = ('lesson',)
     queryset = Lesson.objects.all()
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ('video_id',)
     permission_classes = [IsAuthenticated | IsAdminUser]
-    pagination_class = MyPagination
+    pagination_class = KeysetPagination
 
 
-class LessonRetrieveAPIView(generics.RetrieveAPIView):
+class LessonRetrieveAPIView(CachedResponseMixin, SerializerTimingMixin, generics.RetrieveAPIView):
     serializer_class = LessonSerializer
+    cache_scopes = ('lesson',)
+    per_user = True
     queryset = Lesson.objects.all()
     permission_classes = [IsAuthenticated, IsAdminUser | IsMaterialsOwner | IsModerator]
 
 
-class LessonUpdateAPIView(generics.UpdateAPIView):
+class LessonUpdateAPIView(SerializerTimingMixin, generics.UpdateAPIView):
     serializer_class = LessonSerializer
     queryset = Lesson.objects.all()
     permission_classes = [IsAuthenticated, IsAdminUser | IsMaterialsOwner | IsModerator]
@@ -87,13 +218,92 @@ class LessonDestroyAPIView(generics.DestroyAPIView):
     permission_classes = [IsAuthenticated, IsAdminUser | ~IsModerator | IsMaterialsOwner]
 
 
-class PaymentsListAPIView(generics.ListAPIView):
+class SearchAPIView(APIView):
+    """
+    Courses and lessons matching the `q` query, most relevant first with highlighted description.
+
+    Courses are limited by the same rules as the course list.
+    """
+    permission_classes = [IsAuthenticated | IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'q': ['Обязательный параметр']}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.user.role == UserRole.MEMBER:
+            courses = Course.objects.filter(owner_id=request.user.pk)
+        else:
+            courses = Course.objects.all()
+        limit = settings.SEARCH_RESULTS_LIMIT
+
+        return Response({
+            'courses': CourseSearchSerializer(search(courses, text)[:limit], many=True).data,
+            'lessons': LessonSearchSerializer(search(Lesson.objects.all(), text)[:limit], many=True).data,
+        })
+
+
+class PaymentsListAPIView(SerializerTimingMixin, generics.ListAPIView):
     serializer_class = PaymentSerializer
     queryset = Payments.objects.all()
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ('paid_course', 'paid_lesson', 'payment_method')
     ordering_fields = ('payment_date',)
     permission_classes = [IsAuthenticated | IsAdminUser]
+    pagination_class = KeysetPagination
+
+
+class PaymentsExportAPIView(generics.GenericAPIView):
+    """
+    All filtered payments streamed as CSV or NDJSON, chosen by `file_format`.
+    """
+    queryset = Payments.objects.all()
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = {
+        'payment_date': ['gte', 'lte'],
+        'paid_course': ['exact'],
+        'paid_lesson': ['exact'],
+        'payment_method': ['exact'],
+    }
+    permission_classes = [IsAdminUser]
+    fields = ('id', 'user', 'payment_date', 'paid_course', 'paid_lesson', 'amount', 'payment_method',
+              'stripe_session_id')
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in CONTENT_TYPES:
+            return Response({'file_format': [f'Доступные форматы: {", ".join(CONTENT_TYPES)}']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # rows are read after the view has returned, the database is chosen while the request is routed
+        queryset = queryset.using(queryset.db)
+
+        export = aexport_rows if isinstance(request._request, ASGIRequest) else export_rows
+        response = StreamingHttpResponse(
+            export(queryset, self.fields, file_format, settings.PAYMENTS_EXPORT_CHUNK_SIZE),
+            content_type=CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="payments.{file_format}"'
+        return response
+
+
+class RevenueListAPIView(SerializerTimingMixin, generics.ListAPIView):
+    """
+    Daily revenue per course or lesson and payment method, read from rollups.
+    """
+    serializer_class = RevenueRollupSerializer
+    queryset = RevenueRollup.objects.all()
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = {
+        'date': ['gte', 'lte'],
+        'paid_course': ['exact'],
+        'paid_lesson': ['exact'],
+        'payment_method': ['exact'],
+    }
+    ordering_fields = ('date',)
+    permission_classes = [IsAdminUser]
+    pagination_class = KeysetPagination
 
 
 class SubscriptionCreateAPIView(generics.CreateAPIView):
@@ -101,10 +311,10 @@ class SubscriptionCreateAPIView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated | IsAdminUser]
 
     def create(self, request, *args, **kwargs):
-        course = get_object_or_404(Course, pk=kwargs.get('pk'))
+        course = get_course_or_404(kwargs.get('pk'))
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(user=self.request.user, course=course)
+            Subscription.objects.get_or_create(user_id=self.request.user.pk, course=course)
             return Response(status=status.HTTP_201_CREATED)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
@@ -114,8 +324,8 @@ class SubscriptionDestroyApiView(generics.DestroyAPIView):
     permission_classes = [IsAuthenticated | IsAdminUser]
 
     def delete(self, request, *args, **kwargs):
-        course = get_object_or_404(Course, pk=kwargs.get('pk'))
-        subscription = get_object_or_404(Subscription, user=request.user, course=course)
+        course = get_course_or_404(kwargs.get('pk'))
+        subscription = get_object_or_404(Subscription, user_id=request.user.pk, course=course)
         self.perform_destroy(subscription)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -126,11 +336,9 @@ class LessonBuyAPIView(APIView):
     def post(self, *args, **kwargs):
         lesson = get_object_or_404(Lesson, pk=kwargs.get('pk'))
 
-        lesson_name = lesson.title
-        lesson_price = lesson.price
         user = self.request.user.pk
 
-        stripe_session = stripe_payment_created(lesson_name, lesson_price, user)
+        stripe_session = stripe_payment_created(lesson, user)
 
         return Response({"Payment url": f"{stripe_session.url}"}, status=status.HTTP_200_OK)
 
@@ -139,12 +347,92 @@ class CourseBuyAPIView(APIView):
     permission_classes = [IsAuthenticated | IsAdminUser]
 
     def post(self, *args, **kwargs):
+        # the price is sent to stripe, a course from the object cache may be out of date
         course = get_object_or_404(Course, pk=kwargs.get('pk'))
 
-        course_name = course.title
-        course_price = course.price
         user = self.request.user.pk
 
-        stripe_session = stripe_payment_created(course_name, course_price, user)
+        stripe_session = stripe_payment_created(course, user)
 
         return Response({"Payment url": f"{stripe_session.url}"}, status=status.HTTP_200_OK)
+
+
+def authenticate_jwt(request):
+    try:
+        result = ClaimsJWTAuthentication().authenticate(Request(request))
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+class BuyAsyncView(View):
+    """
+    Checkout view served natively under ASGI, stripe request doesn't hold a worker.
+    """
+    material_model = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def post(self, request, *args, **kwargs):
+        user = await sync_to_async(authenticate_jwt)(request)
+        if user is None:
+            return JsonResponse({'detail': 'Учетные данные не были предоставлены.'},
+                                status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            material = await self.material_model.objects.aget(pk=kwargs.get('pk'))
+        except self.material_model.DoesNotExist:
+            raise Http404
+
+        try:
+            stripe_session = await astripe_payment_created(material, user.pk)
+        except (httpx.HTTPError, stripe.error.StripeError):
+            return JsonResponse({'detail': 'Платежный сервис недоступен.'}, status=status.HTTP_502_BAD_GATEWAY)
+
+        return JsonResponse({"Payment url": f"{stripe_session['url']}"}, status=status.HTTP_200_OK)
+
+
+class LessonBuyAsyncView(BuyAsyncView):
+    material_model = Lesson
+
+
+class CourseBuyAsyncView(BuyAsyncView):
+    material_model = Course
+
+
+class StripeWebhookView(View):
+    """
+    Store verified stripe events and leave creating payments to celery, stripe gets the answer right away.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    def post(self, request, *args, **kwargs):
+        if not settings.STRIPE_WEBHOOK_SECRET:
+            # events can't be verified, stripe retries them until the secret is configured
+            return HttpResponse(status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        try:
+            event = stripe.Webhook.construct_event(
+                request.body, request.headers.get('Stripe-Signature', ''), settings.STRIPE_WEBHOOK_SECRET
+            )
+        except (ValueError, stripe.error.SignatureVerificationError):
+            return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+
+        # stripe retries deliver the same event id again
+        _, created = StripeEvent.objects.get_or_create(
+            event_id=event['id'],
+            defaults={'type': event['type'], 'payload': json.loads(request.body)},
+        )
+        if created:
+            transaction.on_commit(process_stripe_events.delay)
+
+        return HttpResponse(status=status.HTTP_200_OK)
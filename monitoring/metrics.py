@@ -0,0 +1,105 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# timings of the request being processed, None outside of requests
+current_timings = ContextVar('current_timings', default=None)
+
+# with PROMETHEUS_MULTIPROC_DIR set (by config/gunicorn.py) each worker process writes its values to files
+# of the directory and /metrics aggregates the values of all workers, including restarted ones
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Request duration.', ('view', 'method', 'status'),
+                             buckets=DURATION_BUCKETS)
+DB_DURATION = Histogram('http_request_db_duration_seconds', 'Time spent in SQL queries.', ('view', 'method'),
+                        buckets=DURATION_BUCKETS)
+DB_QUERIES = Histogram('http_request_db_queries', 'SQL queries per request.', ('view', 'method'),
+                       buckets=QUERIES_BUCKETS)
+SERIALIZER_DURATION = Histogram('http_request_serializer_duration_seconds', 'Time spent in serializers.',
+                                ('view', 'method'), buckets=DURATION_BUCKETS)
+EXTERNAL_DURATION = Histogram('http_request_external_duration_seconds', 'Time spent in external calls.',
+                              ('view', 'method', 'service'), buckets=DURATION_BUCKETS)
+
+CACHE_REQUESTS = Counter('cache_requests_total', 'Object cache lookups.', ('cache', 'tier', 'result'))
+
+
+class Timings:
+    """
+    Durations collected while a request is processed.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0
+        self.serializer = 0
+        self.external = {}
+
+    def add_external(self, service, duration):
+        self.external[service] = self.external.get(service, 0) + duration
+
+    def server_timing(self):
+        total = time.perf_counter() - self.start
+        metrics = [
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+            f'serializer;dur={self.serializer * 1000:.1f}',
+        ]
+        metrics += [f'{service};dur={duration * 1000:.1f}' for service, duration in self.external.items()]
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+    def observe(self, view, method, status):
+        REQUEST_DURATION.labels(view, method, status).observe(time.perf_counter() - self.start)
+        DB_DURATION.labels(view, method).observe(self.db)
+        DB_QUERIES.labels(view, method).observe(self.queries)
+        SERIALIZER_DURATION.labels(view, method).observe(self.serializer)
+        for service, duration in self.external.items():
+            EXTERNAL_DURATION.labels(view, method, service).observe(duration)
+
+
+def query_timer(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - start
+        timings.queries += 1
+
+
+def install_query_timer(sender, connection, **kwargs):
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+@contextmanager
+def track_external(service):
+    """
+    Add duration of a call to external service (stripe, smtp) to the current request timings.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add_external(service, time.perf_counter() - start)
+
+
+def render_metrics():
+    """
+    Metrics in Prometheus text format, of all worker processes in multiprocess mode.
+    """
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return generate_latest(REGISTRY)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,52 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from monitoring.metrics import Timings, current_timings
+
+
+class TimingMiddleware:
+    """
+    Collect SQL, serializer and external calls timings of every request,
+    report them in Server-Timing header and add them to /metrics histograms.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = Timings()
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.process_response(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = Timings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.process_response(request, response, timings)
+
+    def process_response(self, request, response, timings):
+        response['Server-Timing'] = timings.server_timing()
+        timings.observe(get_view_name(request), request.method, response.status_code)
+        return response
+
+
+def get_view_name(request):
+    if request.resolver_match is None:
+        return 'unmatched'
+
+    func = request.resolver_match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    return view_class.__name__ if view_class else func.__name__
@@ -0,0 +1,31 @@
+import time
+from functools import wraps
+
+from monitoring.metrics import current_timings
+
+
+class SerializerTimingMixin:
+    """
+    Add time spent in serializers representation to the current request timings.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        serializer.to_representation = timed_representation(serializer.to_representation)
+        return serializer
+
+
+def timed_representation(to_representation):
+    @wraps(to_representation)
+    def wrapper(*args, **kwargs):
+        timings = current_timings.get()
+        if timings is None:
+            return to_representation(*args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return to_representation(*args, **kwargs)
+        finally:
+            timings.serializer += time.perf_counter() - start
+
+    return wrapper
@@ -0,0 +1,135 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import Counter, Histogram, multiprocess
+from prometheus_client.values import MultiProcessValue
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from materials.models import Course
+from monitoring.metrics import render_metrics
+from users.models import User
+
+
+class TimingMiddlewareTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        Course.objects.create(
+            title='test',
+            description='test',
+            owner=self.user
+        )
+
+    def test_server_timing(self):
+        """
+        Test Server-Timing header with SQL and serializer timings.
+        """
+
+        response = self.client.get(reverse('materials:course-list'))
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="2 queries", serializer;dur=[\d.]+, total;dur=[\d.]+$'
+        )
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics(self):
+        """
+        Test request histograms at /metrics.
+        """
+
+        self.client.get(reverse('materials:course-list'))
+
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",status="200",view="CourseViewSet"}',
+            response.content.decode()
+        )
+
+        self.assertIn(
+            'http_request_db_queries_bucket{le="2.0",method="GET",view="CourseViewSet"}',
+            response.content.decode()
+        )
+
+    def test_metrics_forbidden(self):
+        """
+        Test metrics not served without the scraper token.
+        """
+
+        self.assertEqual(
+            self.client.get(reverse('metrics')).status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+
+        with override_settings(METRICS_TOKEN='secret'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+
+
+class MultiProcessMetricsTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_workers(self):
+        """
+        Test metrics of worker processes summed up, values of exited workers kept.
+        """
+
+        with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': self.directory.name}):
+            for pid in (101, 102):
+                with mock.patch('prometheus_client.values.ValueClass', MultiProcessValue(lambda: pid)):
+                    Counter('test_total', 'Test.', ('cache',), registry=None).labels('users').inc()
+                    Histogram('test_seconds', 'Test.', ('view',), buckets=(0.1, 1), registry=None).labels(
+                        'test'
+                    ).observe(0.05 * pid / 100)
+            multiprocess.mark_process_dead(101)
+            metrics = render_metrics().decode().split('\n')
+
+        self.assertIn(
+            'test_total{cache="users"} 2.0',
+            metrics
+        )
+
+        self.assertEqual(
+            [line for line in metrics if line.startswith('test_seconds_bucket')],
+            [
+                'test_seconds_bucket{le="0.1",view="test"} 2.0',
+                'test_seconds_bucket{le="1.0",view="test"} 2.0',
+                'test_seconds_bucket{le="+Inf",view="test"} 2.0',
+            ]
+        )
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from materials.caching import TieredCache
+from users.models import User
+from users.tokens import USER_CLAIMS
+
+user_cache = TieredCache('users')
+
+# the rest of the row, password hash included, is loaded from the database when it is used
+USER_CACHE_FIELDS = ('email', 'role', 'is_active', 'is_staff', 'is_superuser')
+
+
+def get_cached_user(pk):
+    """
+    User with fields used by authentication and permissions from the object cache, None for deleted users.
+    """
+    return user_cache.get_or_set(
+        pk, lambda: User.objects.filter(pk=pk).only(*USER_CACHE_FIELDS).first(), tags=[f'user:{pk}']
+    )
+
+
+def get_user_status(pk):
+    """
+    Current role and status of the user as in token claims.
+    """
+    user = get_cached_user(pk)
+    return tuple(getattr(user, claim) for claim in USER_CLAIMS) if user else ()
+
+
+def forget_users(*pks):
+    user_cache.invalidate(*[f'user:{pk}' for pk in pks])
+
+
+class ClaimsTokenUser(TokenUser):
+    """
+    User made of access token claims without loading the user row, is_staff and is_superuser come from
+    the claims of TokenUser.
+    """
+
+    @cached_property
+    def role(self):
+        return self.token['role']
+
+    @cached_property
+    def is_active(self):
+        return self.token['is_active']
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication with users taken from the object cache instead of a query per request.
+
+    With JWT_TOKEN_USER on, tokens with user claims authenticate a ClaimsTokenUser. Claims are compared with
+    the cached user status, tokens of deactivated users or users with changed role fall back to the user row,
+    which rejects inactive users.
+    """
+
+    def get_user(self, validated_token):
+        if settings.JWT_TOKEN_USER and all(claim in validated_token for claim in USER_CLAIMS):
+            user = ClaimsTokenUser(validated_token)
+            if get_user_status(user.pk) == tuple(validated_token[claim] for claim in USER_CLAIMS):
+                if not user.is_active:
+                    raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+                return user
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
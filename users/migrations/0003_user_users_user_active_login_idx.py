@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_role'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_active', 'last_login'], name='users_user_active_login_idx'),
+        ),
+    ]
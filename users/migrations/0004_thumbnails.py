@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_users_user_active_login_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_thumbnails',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='миниатюры аватара'),
+        ),
+    ]
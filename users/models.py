@@ -17,6 +17,7 @@ class User(AbstractUser):
     phone = models.CharField(max_length=35, verbose_name='номер телефона', **NULLABLE)
     country = models.CharField(max_length=50, verbose_name='страна', **NULLABLE)
     avatar = models.ImageField(upload_to='users/', verbose_name='аватар', **NULLABLE)
+    avatar_thumbnails = models.JSONField(verbose_name='миниатюры аватара', editable=False, **NULLABLE)
 
     role = models.CharField(max_length=9, choices=UserRole.choices, default=UserRole.MEMBER)
 
@@ -26,3 +27,6 @@ class User(AbstractUser):
     class Meta:
         verbose_name = 'пользователь'
         verbose_name_plural = 'пользователи'
+        indexes = [
+            models.Index(fields=['is_active', 'last_login'], name='users_user_active_login_idx'),
+        ]
@@ -1,11 +1,23 @@
+from django.conf import settings
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from materials.serializers import PaymentSerializer
+from materials.serializers import PaymentSerializer, ThumbnailsField
 from users.models import User
+from users.tokens import UserClaimsRefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
-    payment_history = PaymentSerializer(source='payments_set', many=True)
+    payment_history = serializers.SerializerMethodField(read_only=True)
+    payment_history_url = serializers.HyperlinkedIdentityField(view_name='users:user-payments')
+    avatar_thumbnails = ThumbnailsField('avatar')
+
+    def get_payment_history(self, instance):
+        # most recent payments, prefetched by UserViewSet.get_queryset, full history is paginated by the link
+        payments = getattr(instance, 'recent_payments', None)
+        if payments is None:
+            payments = instance.payments_set.order_by('-payment_date', '-pk')[:settings.USER_PAYMENT_HISTORY_SIZE]
+        return PaymentSerializer(payments, many=True, context=self.context).data
 
     class Meta:
         model = User
@@ -13,7 +25,12 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class LimitedUserSerializer(serializers.ModelSerializer):
+    avatar_thumbnails = ThumbnailsField('avatar')
 
     class Meta:
         model = User
         exclude = ('password', 'last_name',)
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = UserClaimsRefreshToken
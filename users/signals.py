@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from materials.caching import invalidate_responses
+from materials.signals import schedule_thumbnails
+from users.authentication import forget_users
+from users.models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_users(instance.pk)
+    invalidate_responses(f'user:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+def avatar_saved(sender, instance, **kwargs):
+    schedule_thumbnails(instance, 'avatar')
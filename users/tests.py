@@ -1,3 +1,252 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from materials.models import Course, Payments
+from materials.tasks import check_last_session
+from users.authentication import ClaimsJWTAuthentication, ClaimsTokenUser, get_cached_user
+from users.models import User
+from users.tokens import UserClaimsRefreshToken
+
+
+@override_settings(USER_PAYMENT_HISTORY_SIZE=3)
+class UserPaymentHistoryTestCase(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='member@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.user2 = User.objects.create(
+            email='member2@test.ru',
+            password='test',
+            role='member',
+
+            is_active=True,
+        )
+
+        self.payments = Payments.objects.bulk_create(
+            Payments(user=self.user, amount=i, payment_method='наличные') for i in range(5)
+        )
+
+    def test_user_retrieve(self):
+        """
+        Test user payment history is limited to the most recent payments.
+        """
+
+        response = self.client.get(
+            reverse('users:user-detail', kwargs={'pk': self.user.pk})
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertEqual(
+            [payment['id'] for payment in response.json()['payment_history']],
+            [payment.pk for payment in self.payments[::-1][:3]]
+        )
+
+        self.assertTrue(
+            response.json()['payment_history_url'].endswith(
+                reverse('users:user-payments', kwargs={'pk': self.user.pk})
+            )
+        )
+
+    def test_user_payments(self):
+        """
+        Test paginated user payments.
+        """
+
+        response = self.client.get(
+            reverse('users:user-payments', kwargs={'pk': self.user.pk}),
+            {'page_size': 3}
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        next_response = self.client.get(response.json()['next'])
+
+        self.assertEqual(
+            [payment['id'] for payment in response.json()['results'] + next_response.json()['results']],
+            [payment.pk for payment in self.payments[::-1]]
+        )
+
+    def test_another_user_payments(self):
+        """
+        Test getting payments of another user.
+        """
+
+        response = self.client.get(
+            reverse('users:user-payments', kwargs={'pk': self.user2.pk})
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+
+    def test_user_list(self):
+        """
+        Test paginated user list.
+        """
+
+        response = self.client.get(
+            reverse('users:user-list'),
+            {'page_size': 1}
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        self.assertEqual(
+            len(response.json()['results']),
+            1
+        )
+
+        self.assertIsNotNone(
+            response.json()['next']
+        )
+
+
+@override_settings(JWT_TOKEN_USER=True)
+class TokenUserTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+        self.client = APIClient()
+        self.user = User.objects.create(
+            email='moderator@test.ru',
+            role='moderator',
+
+            is_active=True,
+        )
+        self.user.set_password('test')
+        self.user.save()
+
+        Course.objects.create(
+            title='test',
+            description='test',
+        )
+
+        response = self.client.post(
+            reverse('users:token_obtain_pair'),
+            {'email': 'moderator@test.ru', 'password': 'test'}
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["access"]}')
+
+    def test_no_user_query(self):
+        """
+        Test authentication and role queryset by token claims without loading the user.
+        """
+
+        self.client.get(reverse('materials:course-list'))
+
+        # courses page and their lessons, the user status is cached by the first request
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('materials:course-list'), {'page_size': 5})
+
+        self.assertEqual(
+            len(response.json()['results']),
+            1
+        )
+
+    def test_role_changed(self):
+        """
+        Test token with outdated role falls back to the user row.
+        """
+
+        self.user.role = 'member'
+        self.user.save()
+
+        response = self.client.get(reverse('materials:course-list'))
+
+        self.assertEqual(
+            response.json()['results'],
+            []
+        )
+
+    def test_deactivated(self):
+        """
+        Test tokens of users deactivated by check_last_session stop working.
+        """
+
+        response = self.client.get(reverse('materials:course-list'))
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+        User.objects.filter(pk=self.user.pk).update(last_login=timezone.now() - timedelta(days=200))
+        check_last_session()
+
+        response = self.client.get(reverse('materials:course-list'))
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_superuser_claim(self):
+        """
+        Test superuser status of the token user taken from token claims.
+        """
+
+        self.user.is_superuser = True
+        self.user.save()
+        token = UserClaimsRefreshToken.for_user(self.user).access_token
+
+        with self.assertNumQueries(1):
+            user = ClaimsJWTAuthentication().get_user(token)
+
+        self.assertEqual(
+            (type(user), user.is_superuser),
+            (ClaimsTokenUser, True)
+        )
+
+    def test_cached_fields(self):
+        """
+        Test cached users hold no password hash.
+        """
+
+        self.client.get(reverse('materials:course-list'))
+
+        self.assertIn(
+            'password',
+            get_cached_user(self.user.pk).get_deferred_fields()
+        )
+
+    @override_settings(OBJECT_CACHE_ENABLED=False)
+    def test_no_shared_cache(self):
+        """
+        Test users are read from the database without a shared cache, deactivation by another process applies at once.
+        """
+
+        self.client.get(reverse('materials:course-list'))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = self.client.get(reverse('materials:course-list'))
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
@@ -0,0 +1,16 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+USER_CLAIMS = ('role', 'is_staff', 'is_superuser', 'is_active')
+
+
+class UserClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token with user role and status claims, access tokens made from it copy them.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
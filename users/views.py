@@ -1,16 +1,33 @@
-from rest_framework import viewsets
+from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from materials.models import Payments
+from materials.paginators import KeysetPagination, PaymentsHistoryPagination
+from materials.serializers import PaymentSerializer
+from monitoring.mixins import SerializerTimingMixin
 from users.models import User
 from users.serializers import UserSerializer, LimitedUserSerializer
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     serializer_class = UserSerializer
-    queryset = User.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = User.objects.all()
+        if self.get_serializer_class() is UserSerializer:
+            queryset = queryset.prefetch_related(Prefetch(
+                'payments_set',
+                queryset=Payments.objects.order_by('-payment_date', '-pk')[:settings.USER_PAYMENT_HISTORY_SIZE],
+                to_attr='recent_payments',
+            ))
+        return queryset
 
     def update(self, request, *args, **kwargs):
         if self.kwargs.get('pk') != str(self.request.user.pk):
@@ -25,3 +42,15 @@ class UserViewSet(viewsets.ModelViewSet):
             return LimitedUserSerializer
         else:
             return UserSerializer
+
+    @action(detail=True, pagination_class=PaymentsHistoryPagination)
+    def payments(self, request, pk=None):
+        if pk != str(request.user.pk) and not request.user.is_staff:
+            return Response({
+                'message': 'Нет прав на выполнение этого действия!.',
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        user = get_object_or_404(User, pk=pk)
+        page = self.paginate_queryset(Payments.objects.filter(user=user))
+        serializer = PaymentSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)